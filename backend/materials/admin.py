@@ -1,4 +1,8 @@
 from django.contrib import admin
-from .models import Material
+from .models import Material, LLMCacheEntry, Job, UploadCacheEntry, DictionaryEntry
 
 admin.site.register(Material)
+admin.site.register(LLMCacheEntry)
+admin.site.register(Job)
+admin.site.register(UploadCacheEntry)
+admin.site.register(DictionaryEntry)
@@ -0,0 +1,129 @@
+# chunking.py
+
+import re
+from functools import lru_cache
+
+import nltk
+
+# Rough English average; good enough for budgeting prompt sizes
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[A-Z0-9\"'(\[])")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n+")
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1 if text else 0
+
+
+def split_paragraphs(text):
+    """Splits on blank lines; falls back to single newlines for text without them."""
+    paragraphs = [p.strip() for p in _PARAGRAPH_BREAK.split(text) if p.strip()]
+    if len(paragraphs) <= 1:
+        paragraphs = [p.strip() for p in text.split("\n") if p.strip()]
+    return paragraphs
+
+
+@lru_cache(maxsize=1)
+def _has_punkt():
+    try:
+        nltk.data.find("tokenizers/punkt_tab")
+        return True
+    except LookupError:
+        return False
+
+
+def split_sentences(text):
+    """Uses nltk's punkt tokenizer when its data is installed, else a regex splitter."""
+    if _has_punkt():
+        sentences = nltk.sent_tokenize(text)
+    else:
+        sentences = _SENTENCE_END.split(text)
+    return [s.strip() for s in sentences if s.strip()]
+
+
+def _split_words(text, max_tokens):
+    """Last resort for a single sentence that is over budget on its own."""
+    words = text.split()
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces, current, size = [], [], 0
+    for word in words:
+        if current and size + len(word) + 1 > max_chars:
+            pieces.append(" ".join(current))
+            current, size = [], 0
+        current.append(word)
+        size += len(word) + 1
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_text(text, max_tokens):
+    """
+    Packs paragraphs into chunks of at most ~max_tokens.
+    Oversized paragraphs are split on sentence boundaries, and oversized
+    sentences on word boundaries, so no chunk ever exceeds the budget.
+    """
+    units = []
+    for paragraph in split_paragraphs(text):
+        if estimate_tokens(paragraph) <= max_tokens:
+            units.append((paragraph, "\n\n"))
+            continue
+        pieces = []
+        for sentence in split_sentences(paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                pieces.append(sentence)
+            else:
+                pieces.extend(_split_words(sentence, max_tokens))
+        # Only the first piece starts a new paragraph
+        units.extend((piece, "\n\n" if i == 0 else " ") for i, piece in enumerate(pieces))
+
+    chunks, current, current_tokens = [], "", 0
+    for unit, joiner in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = "", 0
+        current = f"{current}{joiner}{unit}" if current else unit
+        current_tokens += unit_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_words(text, min_words=80, max_words=250):
+    """
+    Packs sentences into chunks of roughly min_words..max_words words,
+    never crossing a paragraph break unless the chunk is still too short.
+    """
+    chunks, current, count = [], [], 0
+
+    def flush():
+        nonlocal current, count
+        if current:
+            chunks.append(" ".join(current))
+        current, count = [], 0
+
+    for paragraph in split_paragraphs(text):
+        for sentence in split_sentences(paragraph):
+            pieces = [sentence]
+            if len(sentence.split()) > max_words:
+                words = sentence.split()
+                pieces = [" ".join(words[i:i + max_words]) for i in range(0, len(words), max_words)]
+            for piece in pieces:
+                size = len(piece.split())
+                if current and count + size > max_words:
+                    flush()
+                current.append(piece)
+                count += size
+        # Prefer ending chunks at paragraph ends once they are long enough
+        if count >= min_words:
+            flush()
+    flush()
+
+    # Fold a short tail into the previous chunk when it still fits
+    if len(chunks) > 1:
+        tail = len(chunks[-1].split())
+        if tail < min_words and len(chunks[-2].split()) + tail <= max_words:
+            chunks[-2] = f"{chunks[-2]} {chunks.pop()}"
+    return chunks
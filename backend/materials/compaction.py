@@ -0,0 +1,196 @@
+# compaction.py
+
+import os
+import re
+from collections import Counter
+
+from .caching import CacheStats
+from .chunking import estimate_tokens
+
+# A line at the top or bottom of at least this share of pages (or, without
+# page breaks, seen this many times) is treated as a running header/footer
+REPEATED_PAGE_SHARE = float(os.getenv("COMPACT_REPEATED_PAGE_SHARE", "0.5"))
+REPEATED_LINE_COUNT = int(os.getenv("COMPACT_REPEATED_LINE_COUNT", "3"))
+# How many lines at each edge of a page can be header/footer (one on short pages)
+PAGE_EDGE_LINES = 2
+# Only lines this short have their numbers ignored when matching repeats;
+# longer lines that differ by a number (table rows, dated entries) are
+# different lines
+HEADER_MAX_WORDS = 10
+# Word-set Jaccard similarity above which a paragraph counts as a near-duplicate
+NEAR_DUPLICATE_SIMILARITY = float(os.getenv("COMPACT_NEAR_DUPLICATE_SIMILARITY", "0.9"))
+# How many earlier paragraphs each paragraph is compared against
+NEAR_DUPLICATE_WINDOW = int(os.getenv("COMPACT_NEAR_DUPLICATE_WINDOW", "50"))
+# Paragraphs shorter than this are only dropped as exact duplicates
+NEAR_DUPLICATE_MIN_WORDS = 8
+# If removing repeated body lines and duplicate paragraphs would cost more than
+# this share of the tokens, the text is probably repetitive by design (numbered
+# exercises, forms) and only headers/footers and page numbers are removed
+MAX_SAVED_SHARE = float(os.getenv("COMPACT_MAX_SAVED_SHARE", "0.25"))
+
+stats = CacheStats("documents", "tokens_before", "tokens_saved")
+
+# Put between pages by extraction.clean_text(..., pages=True); join_pages removes it
+PAGE_BREAK = "\f"
+
+_PAGE_NUMBER = re.compile(r"^(?:page\s*)?\d+(?:\s*(?:of|/)\s*\d+)?$", re.IGNORECASE)
+_DIGITS = re.compile(r"\d+")
+_WORD = re.compile(r"\w+")
+_SPACES = re.compile(r"[ \t\u00a0\u200b]+")
+_BLANK_LINE = re.compile(r"\n\s*\n")
+
+
+def _line_key(line):
+    """Short (header-like) lines that only differ in page numbers or case share a key."""
+    key = line.lower()
+    return _DIGITS.sub("#", key) if len(key.split()) <= HEADER_MAX_WORDS else key
+
+
+def _edges(page):
+    """Indexes of the lines near the top and bottom of a page."""
+    filled = [index for index, line in enumerate(page) if line]
+    depth = max(1, min(PAGE_EDGE_LINES, len(filled) // 4))
+    return set(filled[:depth] + filled[-depth:])
+
+
+def _running_keys(pages):
+    """Edge keys that recur on enough pages to be running headers/footers."""
+    # Count each line once per page it appears on
+    seen = Counter(key for page in pages for key in {_line_key(page[index]) for index in _edges(page)})
+    threshold = max(2, int(len(pages) * REPEATED_PAGE_SHARE + 0.5))
+    return {key for key, count in seen.items() if count >= threshold}
+
+
+def _strip_pages(text):
+    """
+    The text's lines without bare page numbers and, given PAGE_BREAK
+    separated pages, without running headers/footers (the first copy is
+    kept). A blank line ends each page. Returns (lines, lines_removed).
+    """
+    pages = [[_SPACES.sub(" ", line).strip() for line in page.split("\n")] for page in text.split(PAGE_BREAK)]
+    running = _running_keys(pages) if len(pages) >= 2 else set()
+
+    lines = []
+    removed = 0
+    kept_running = set()
+    for page in pages:
+        edges = _edges(page) if running else ()
+        for index, line in enumerate(page):
+            if line and _PAGE_NUMBER.match(line):
+                removed += 1
+                continue
+            if index in edges:
+                key = _line_key(line)
+                if key in running:
+                    if key in kept_running:
+                        removed += 1
+                        continue
+                    kept_running.add(key)
+            lines.append(line)
+        lines.append("")
+    return lines, removed
+
+
+def join_pages(text):
+    """
+    Drops running headers/footers and page numbers from PAGE_BREAK separated
+    pages, then joins the pages with newlines so no marker is left behind.
+    """
+    if PAGE_BREAK not in text:
+        return text
+    lines, _ = _strip_pages(text)
+    return "\n".join(line for line in lines if line)
+
+
+def _drop_repeated_lines(lines):
+    """Without page breaks: keeps the first copy of lines seen REPEATED_LINE_COUNT times or more."""
+    seen = Counter(_line_key(line) for line in lines if line)
+    repeated = {key for key, count in seen.items() if count >= REPEATED_LINE_COUNT}
+    kept_repeated = set()
+    for line in lines:
+        key = _line_key(line) if line else ""
+        if key in repeated:
+            if key in kept_repeated:
+                continue
+            kept_repeated.add(key)
+        yield line
+
+
+def _paragraphs(lines, by_blank_lines):
+    """Blank-line separated paragraphs, or one per line for cleaned text that has no blank lines."""
+    if not by_blank_lines:
+        yield from (line for line in lines if line)
+        return
+
+    paragraph = []
+    for line in lines:
+        if line:
+            paragraph.append(line)
+        elif paragraph:
+            yield "\n".join(paragraph)
+            paragraph = []
+    if paragraph:
+        yield "\n".join(paragraph)
+
+
+def _dedupe(paragraphs):
+    """Drops exact duplicates, and near-duplicates of recent paragraphs."""
+    exact = set()
+    recent = []
+    for paragraph in paragraphs:
+        words = _WORD.findall(paragraph.lower())
+        key = " ".join(words)
+        if key in exact:
+            continue
+
+        if len(words) >= NEAR_DUPLICATE_MIN_WORDS:
+            word_set = frozenset(words)
+            if any(len(word_set & other) / len(word_set | other) >= NEAR_DUPLICATE_SIMILARITY for other in recent):
+                continue
+            recent.append(word_set)
+            del recent[:-NEAR_DUPLICATE_WINDOW]
+
+        exact.add(key)
+        yield paragraph
+
+
+def compact_text(text):
+    """
+    Strips what an LLM doesn't need to read: bare page numbers, running
+    headers/footers (lines at the edges of PAGE_BREAK separated pages; else
+    lines repeated REPEATED_LINE_COUNT times), duplicate and near-duplicate
+    paragraphs, and extra whitespace. First copies of repeats are kept.
+    Repeated body lines and duplicate paragraphs are left in place when they
+    would cost more than MAX_SAVED_SHARE of the tokens (report["skipped"]).
+    Returns (compacted_text, report) where report has the token counts.
+    """
+    lines, removed_lines = _strip_pages(text)
+    by_blank_lines = any(_BLANK_LINE.search(page) for page in text.split(PAGE_BREAK))
+    separator = "\n\n" if by_blank_lines else "\n"
+    paragraphs = list(_paragraphs(lines, by_blank_lines))
+    stripped = separator.join(paragraphs)
+
+    body_lines = list(_drop_repeated_lines(lines)) if PAGE_BREAK not in text else lines
+    body_paragraphs = list(_paragraphs(body_lines, by_blank_lines))
+    kept = list(_dedupe(body_paragraphs))
+    compacted = separator.join(kept)
+
+    tokens_before = estimate_tokens(text)
+    tokens_after = estimate_tokens(compacted)
+    skipped = estimate_tokens(stripped) - tokens_after > tokens_before * MAX_SAVED_SHARE
+    if skipped:
+        compacted, tokens_after = stripped, estimate_tokens(stripped)
+        body_paragraphs = kept = paragraphs
+    else:
+        removed_lines += len(lines) - len(body_lines)
+    stats.incr("documents")
+    stats.incr("tokens_before", tokens_before)
+    stats.incr("tokens_saved", tokens_before - tokens_after)
+    return compacted, {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+        "lines_removed": removed_lines,
+        "paragraphs_removed": len(body_paragraphs) - len(kept),
+        "skipped": skipped,
+    }
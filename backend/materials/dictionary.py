@@ -0,0 +1,329 @@
+# dictionary.py
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import timedelta
+from urllib.parse import quote
+
+import requests
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from .caching import LRUCache, CacheStats
+from .llm_client import get_session
+from .models import DictionaryEntry
+from .offline_dictionary import get_index
+
+# Ask dictionaryapi.dev for words the offline index doesn't know ("0" for fully offline deployments)
+DICTIONARY_REMOTE = os.getenv("DICTIONARY_REMOTE", "1") == "1"
+DICTIONARY_API_URL = os.getenv("DICTIONARY_API_URL", "https://api.dictionaryapi.dev/api/v2/entries/en/")
+DICTIONARY_TIMEOUT = float(os.getenv("DICTIONARY_TIMEOUT", "10"))
+DICTIONARY_MEMORY_ITEMS = int(os.getenv("DICTIONARY_MEMORY_ITEMS", "4096"))
+DICTIONARY_TTL_DAYS = int(os.getenv("DICTIONARY_TTL_DAYS", "90"))
+# Misses are remembered for a shorter time, in case the upstream learns the word
+DICTIONARY_NEGATIVE_TTL_HOURS = int(os.getenv("DICTIONARY_NEGATIVE_TTL_HOURS", "24"))
+# Concurrent upstream lookups for lookup_many, shared by all requests in a process
+DICTIONARY_WORKERS = int(os.getenv("DICTIONARY_WORKERS", "8"))
+
+_MISS = object()
+
+# word -> (definition or None, expires_at)
+_memory = LRUCache(maxsize=DICTIONARY_MEMORY_ITEMS)
+# word -> Future shared by everyone waiting on the same upstream lookup
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+stats = CacheStats("memory_hits", "offline_hits", "db_hits", "negative_hits", "upstream", "coalesced", "upstream_errors")
+
+
+class DictionaryUnavailable(Exception):
+    pass
+
+
+def normalize(word):
+    return " ".join(word.split()).lower()
+
+
+def _definition(word, meaning, example):
+    return {"word": word, "meaning": meaning, "example": example or ""}
+
+
+def _from_memory(key):
+    item = _memory.get(key)
+    if item is None:
+        return _MISS
+    definition, expires_at = item
+    if expires_at <= timezone.now():
+        _memory.delete(key)
+        return _MISS
+    return definition
+
+
+def _from_offline(key):
+    index = get_index()
+    if index is None:
+        return _MISS
+    found = index.lookup(key)
+    if found is None:
+        return _MISS
+
+    _, meaning, example = found
+    definition = _definition(key, meaning, example)
+    _memory.set(key, (definition, timezone.now() + timedelta(days=DICTIONARY_TTL_DAYS)))
+    return definition
+
+
+def _from_db_many(keys):
+    """Unexpired rows for the given words, in one query; {word: definition or None}."""
+    now = timezone.now()
+    try:
+        entries = list(DictionaryEntry.objects.filter(word__in=keys, expires_at__gt=now))
+        if entries:
+            DictionaryEntry.objects.filter(word__in=[entry.word for entry in entries]).update(hits=F("hits") + 1)
+    except DatabaseError:
+        return {}
+
+    found = {}
+    for entry in entries:
+        definition = _definition(entry.word, entry.meaning, entry.example) if entry.found else None
+        _memory.set(entry.word, (definition, entry.expires_at))
+        found[entry.word] = definition
+    return found
+
+
+def _from_db(key):
+    return _from_db_many([key]).get(key, _MISS)
+
+
+def _expiry(definition, now):
+    if definition is not None:
+        return now + timedelta(days=DICTIONARY_TTL_DAYS)
+    return now + timedelta(hours=DICTIONARY_NEGATIVE_TTL_HOURS)
+
+
+def remember_many(definitions, source):
+    """Stores {word: definition, or None for a miss} in both tiers, with one upsert."""
+    now = timezone.now()
+    entries = []
+    for key, definition in definitions.items():
+        expires_at = _expiry(definition, now)
+        _memory.set(key, (definition, expires_at))
+        entries.append(DictionaryEntry(
+            word=key,
+            meaning=definition["meaning"] if definition else "",
+            example=definition["example"] if definition else "",
+            found=definition is not None,
+            source=source,
+            expires_at=expires_at,
+        ))
+    if not entries:
+        return
+    try:
+        DictionaryEntry.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=["word"],
+            update_fields=["meaning", "example", "found", "source", "expires_at"],
+        )
+    except DatabaseError:
+        pass
+
+
+def remember(key, definition, source):
+    """Stores a definition (or a miss, when definition is None) in both tiers."""
+    remember_many({key: definition}, source)
+
+
+def fetch_remote(word):
+    """
+    Asks dictionaryapi.dev. Returns the first definition, or None if the word is unknown.
+    Raises DictionaryUnavailable when the service can't answer.
+    """
+    try:
+        r = get_session().get(DICTIONARY_API_URL + quote(word), timeout=DICTIONARY_TIMEOUT)
+    except requests.RequestException as e:
+        raise DictionaryUnavailable(str(e)) from e
+    if r.status_code == 404:
+        return None
+    if r.status_code != 200:
+        raise DictionaryUnavailable(f"Dictionary service returned {r.status_code}")
+
+    # Pick the first definition
+    try:
+        first = r.json()[0]["meanings"][0]["definitions"][0]
+    except (ValueError, LookupError, TypeError):
+        return None
+    meaning = first.get("definition", "")
+    if not meaning:
+        return None
+    return _definition(word, meaning, first.get("example", ""))
+
+
+def _singleflight(key, load):
+    """Runs load(key) once per word at a time; concurrent callers share the result."""
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = Future()
+
+    if not leader:
+        stats.incr("coalesced")
+        try:
+            return call.result(timeout=DICTIONARY_TIMEOUT * 2)
+        except FutureTimeoutError:
+            raise DictionaryUnavailable(f"Timed out waiting for the lookup of {key!r}") from None
+
+    try:
+        result = load(key)
+        call.set_result(result)
+        return result
+    except BaseException as e:
+        call.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _fetch(key):
+    stats.incr("upstream")
+    try:
+        return fetch_remote(key)
+    except DictionaryUnavailable:
+        # Outages aren't cached; the next lookup tries again
+        stats.incr("upstream_errors")
+        raise
+
+
+def _offline_miss(key):
+    # Fully offline: remember the miss in this process only
+    _memory.set(key, (None, _expiry(None, timezone.now())))
+
+
+def _load(key):
+    definition = _from_db(key)
+    if definition is not _MISS:
+        stats.incr("db_hits" if definition is not None else "negative_hits")
+        return definition
+    if not DICTIONARY_REMOTE:
+        _offline_miss(key)
+        return None
+
+    definition = _fetch(key)
+    remember(key, definition, "remote")
+    return definition
+
+
+def _resolve(key):
+    """Loads from the database, else upstream; only one thread per word does the work."""
+    return _singleflight(key, _load)
+
+
+def get_executor():
+    """Returns the bounded thread pool used for upstream lookups in this process."""
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid:
+            _executor = ThreadPoolExecutor(max_workers=DICTIONARY_WORKERS, thread_name_prefix="dictionary")
+            _executor_pid = pid
+    return _executor
+
+
+def _cached(key):
+    """Memory, then the offline index; _MISS if neither knows the word."""
+    definition = _from_memory(key)
+    if definition is not _MISS:
+        stats.incr("memory_hits" if definition is not None else "negative_hits")
+        return definition
+
+    definition = _from_offline(key)
+    if definition is not _MISS:
+        stats.incr("offline_hits")
+    return definition
+
+
+def lookup(word):
+    """
+    Returns {"word", "meaning", "example"} for a word, or None if it has no
+    definition. Answers from memory, then the offline WordNet index
+    (including inflected forms), then the shared table, then upstream.
+    Raises DictionaryUnavailable if it has to go upstream and can't.
+    """
+    key = normalize(word)
+    if not key:
+        return None
+
+    definition = _cached(key)
+    if definition is not _MISS:
+        return definition
+    return _resolve(key)
+
+
+def lookup_many(words):
+    """
+    Batch version of lookup(). Returns (definitions, unavailable): definitions
+    maps each normalized word to its definition or None, and unavailable lists
+    the words the upstream couldn't answer. Cached words are answered in place,
+    the shared table is read in one query, and the remaining misses go
+    upstream concurrently on the shared pool. The pool threads only do
+    HTTP; their results are stored here with one upsert.
+    """
+    definitions = {}
+    pending = []
+    for word in words:
+        key = normalize(word)
+        if not key or key in definitions or key in pending:
+            continue
+        definition = _cached(key)
+        if definition is _MISS:
+            pending.append(key)
+        else:
+            definitions[key] = definition
+
+    if pending:
+        stored = _from_db_many(pending)
+        for key, definition in stored.items():
+            stats.incr("db_hits" if definition is not None else "negative_hits")
+            definitions[key] = definition
+        pending = [key for key in pending if key not in stored]
+
+    unavailable = []
+    if pending and not DICTIONARY_REMOTE:
+        for key in pending:
+            _offline_miss(key)
+            definitions[key] = None
+    elif pending:
+        pool = get_executor()
+        futures = {key: pool.submit(_singleflight, key, _fetch) for key in pending}
+        fetched = {}
+        for key, future in futures.items():
+            try:
+                fetched[key] = future.result()
+            except DictionaryUnavailable:
+                unavailable.append(key)
+        remember_many(fetched, "remote")
+        definitions.update(fetched)
+    return definitions, unavailable
+
+
+def report():
+    counters = stats.snapshot()
+    index = get_index()
+    lookups = sum(counters[name] for name in ("memory_hits", "offline_hits", "db_hits", "negative_hits", "upstream"))
+    cached = lookups - counters["upstream"]
+    return {
+        **counters,
+        "hit_rate": round(cached / lookups, 4) if lookups else 0.0,
+        "memory_items": len(_memory),
+        "db_items": DictionaryEntry.objects.count(),
+        "offline_entries": index.count if index is not None else 0,
+    }
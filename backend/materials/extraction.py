@@ -0,0 +1,183 @@
+# extraction.py
+
+import mmap
+import os
+import re
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+
+from lxml import etree
+
+from .compaction import PAGE_BREAK
+from .ocr import ocr_upload
+from .pdf_extraction import extract_pdf
+
+SUPPORTED_EXTENSIONS = ("pdf", "docx", "txt", "pptx", "jpg", "png")
+
+
+# OOXML namespaces (WordprocessingML, DrawingML, PresentationML, relationships)
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+
+class UnsupportedFileType(Exception):
+    pass
+
+
+EMOJI_RE = re.compile(
+    r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]'
+)
+
+
+def clean_lines(lines, pages=False):
+    """
+    Streaming version of clean_text: takes any iterable of text chunks
+    (lines, paragraphs, pages) and yields the lines worth keeping.
+    With pages=True each chunk is a page and PAGE_BREAK is yielded between them,
+    so compaction can tell running headers/footers from body text; pass the
+    result through compaction.join_pages before it leaves the server.
+    """
+    for index, chunk in enumerate(lines):
+        if pages and index:
+            yield PAGE_BREAK
+        for line in chunk.split('\n'):
+            # Remove emojis
+            line = EMOJI_RE.sub('', line)
+            # Remove short lines (less than 5 words)
+            if len(line.split()) > 4:
+                yield line
+
+
+def clean_text(text, pages=False) -> str:
+    """Cleans a string, or an iterable of lines (or pages), into a single string."""
+    if isinstance(text, str):
+        text = (text,)
+    return '\n'.join(clean_lines(text, pages=pages))
+
+
+def file_extension(name):
+    return name.split('.')[-1].lower()
+
+
+@contextmanager
+def local_path(file, suffix=""):
+    """
+    Yields a filesystem path for an uploaded file, so worker processes can
+    open it themselves. Uploads Django already spooled to disk are used as-is.
+    """
+    if hasattr(file, "temporary_file_path"):
+        yield file.temporary_file_path()
+        return
+
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            if hasattr(file, "chunks"):
+                for chunk in file.chunks():
+                    tmp.write(chunk)
+            else:
+                for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                    tmp.write(chunk)
+        yield path
+    finally:
+        os.remove(path)
+
+
+def extract_document(file, ext):
+    """
+    Extracts text from an uploaded file.
+    Returns {"lines", "pages", "timings"}: lines is an iterable of text
+    chunks to feed to clean_text, consumed once; pages and per-page timings
+    are only filled in for PDFs.
+    Raises UnsupportedFileType for anything not in SUPPORTED_EXTENSIONS.
+    """
+    if ext == "pdf":
+        started = time.perf_counter()
+        with local_path(file, ".pdf") as path:
+            pages, timings = extract_pdf(path)
+        return {
+            "lines": (page for page in pages if page),
+            "pages": pages,
+            "timings": {"total_ms": round((time.perf_counter() - started) * 1000, 2), "pages": timings},
+        }
+    return {"lines": iter_text(file, ext), "pages": None, "timings": None}
+
+
+def _iter_txt(file):
+    """Lines of a UTF-8 text upload, read through a memory map of the spooled file."""
+    with local_path(file, ".txt") as path, open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b""):
+                yield line.decode("utf-8").rstrip("\n")
+
+
+def _iter_paragraphs(source, paragraph_tag, text_tag, break_tags=(), tab_tags=()):
+    """
+    Streams paragraph texts out of an OOXML part with lxml iterparse,
+    clearing each paragraph once read so memory stays flat.
+    """
+    for _, element in etree.iterparse(source, events=("end",), tag=paragraph_tag, huge_tree=True):
+        parts = []
+        for node in element.iter(text_tag, *break_tags, *tab_tags):
+            if node.tag == text_tag:
+                parts.append(node.text or "")
+            elif node.tag in break_tags:
+                parts.append("\n")
+            elif node.getparent().tag != W + "tabs":
+                # <w:tabs><w:tab/> are tab stop definitions, not tab characters
+                parts.append("\t")
+        yield "".join(parts)
+
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+def _iter_docx(file):
+    with zipfile.ZipFile(file) as archive, archive.open("word/document.xml") as part:
+        yield from _iter_paragraphs(part, W + "p", W + "t", (W + "br", W + "cr"), (W + "tab",))
+
+
+def _slide_parts(archive):
+    """Slide part names in presentation order."""
+    rels = etree.fromstring(archive.read("ppt/_rels/presentation.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels}
+    presentation = etree.fromstring(archive.read("ppt/presentation.xml"))
+
+    parts = []
+    for slide_id in presentation.iter(P + "sldId"):
+        target = targets.get(slide_id.get(R + "id"))
+        if target:
+            parts.append(target.lstrip("/") if target.startswith("/") else "ppt/" + target)
+    return parts
+
+
+def _iter_pptx(file):
+    with zipfile.ZipFile(file) as archive:
+        for name in _slide_parts(archive):
+            with archive.open(name) as part:
+                yield from _iter_paragraphs(part, A + "p", A + "t", (A + "br",))
+
+
+def iter_text(file, ext):
+    """
+    Yields raw text chunks from a non-PDF upload without materializing the
+    whole document: txt through mmap, DOCX/PPTX straight out of their XML.
+    Raises UnsupportedFileType for anything not in SUPPORTED_EXTENSIONS.
+    """
+    if ext == "txt":
+        return _iter_txt(file)
+    if ext == "docx":
+        return _iter_docx(file)
+    if ext == "pptx":
+        return _iter_pptx(file)
+    if ext in ["jpg", "png"]:
+        # Tesseract's path comes from TESSERACT_CMD (see ocr.py)
+        return iter((ocr_upload(file),))
+    raise UnsupportedFileType(ext)
@@ -0,0 +1,86 @@
+# extractive.py
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .chunking import split_paragraphs, split_sentences
+
+METHODS = ("tfidf", "textrank")
+# TextRank only ranks this many sentences (the best by TF-IDF) on very long inputs
+TEXTRANK_MAX_SENTENCES = 2000
+
+
+def _sentences(text):
+    return [s for p in split_paragraphs(text) for s in split_sentences(p) if len(s.split()) >= 4]
+
+
+def _tfidf_matrix(sentences):
+    vectorizer = TfidfVectorizer(stop_words="english", sublinear_tf=True)
+    try:
+        return vectorizer.fit_transform(sentences)
+    except ValueError:
+        # Only stop words / empty vocabulary
+        return None
+
+
+def tfidf_scores(matrix):
+    """Sum of term weights, damped by sentence length so long sentences don't always win."""
+    totals = np.asarray(matrix.sum(axis=1)).ravel()
+    lengths = np.diff(matrix.indptr).astype(float)
+    return totals / np.sqrt(np.maximum(lengths, 1.0))
+
+
+def textrank_scores(matrix, damping=0.85, iterations=50, tol=1e-6):
+    """
+    PageRank over the sentence cosine-similarity graph (rows are L2-normalized).
+    The graph stays sparse: only sentence pairs that share a term are stored.
+    """
+    similarity = (matrix @ matrix.T).tocsr()
+    similarity.setdiag(0.0)
+    similarity.eliminate_zeros()
+
+    row_sums = np.asarray(similarity.sum(axis=1)).ravel()
+    inverse = np.divide(1.0, row_sums, out=np.zeros_like(row_sums), where=row_sums > 0)
+    # Row-normalized transition matrix, transposed once for the iteration
+    transition_t = (sparse.diags(inverse) @ similarity).T.tocsr()
+
+    n = similarity.shape[0]
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition_t @ scores)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+
+def extractive_summary(text, method="textrank", ratio=0.2, min_sentences=3, max_sentences=10):
+    """
+    Picks the highest scoring sentences and returns them in document order.
+    Runs locally in milliseconds; no LLM involved.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown extractive method: {method}")
+
+    sentences = _sentences(text)
+    count = int(min(max_sentences, max(min_sentences, round(len(sentences) * ratio))))
+    if len(sentences) <= count:
+        return " ".join(sentences) or text.strip()
+
+    matrix = _tfidf_matrix(sentences)
+    if matrix is None:
+        return " ".join(sentences[:count])
+
+    if method == "tfidf":
+        scores = tfidf_scores(matrix)
+    elif len(sentences) > TEXTRANK_MAX_SENTENCES:
+        # Rank a TF-IDF shortlist; sentences outside it can't be picked
+        shortlist = np.argpartition(-tfidf_scores(matrix), TEXTRANK_MAX_SENTENCES - 1)[:TEXTRANK_MAX_SENTENCES]
+        candidates = np.sort(shortlist)
+        scores = np.full(len(sentences), -np.inf)
+        scores[candidates] = textrank_scores(matrix[candidates])
+    else:
+        scores = textrank_scores(matrix)
+    top = np.sort(np.argpartition(-scores, count - 1)[:count])
+    return " ".join(sentences[i] for i in top)
@@ -0,0 +1,157 @@
+# fields.py
+
+import json
+import os
+import zlib
+
+from django import forms
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+# Values smaller than this (encoded bytes) are stored as-is
+COMPRESSION_MIN_BYTES = int(os.getenv("FIELD_COMPRESSION_MIN_BYTES", "1024"))
+# "zlib" or "zstd" (needs the zstandard package, else falls back to zlib)
+COMPRESSION_CODEC = os.getenv("FIELD_COMPRESSION_CODEC", "zlib")
+COMPRESSION_LEVEL = int(os.getenv("FIELD_COMPRESSION_LEVEL", "6"))
+
+# One-byte header in front of every stored value
+RAW = b"\x00"
+ZLIB = b"\x01"
+ZSTD = b"\x02"
+
+
+def compress(data):
+    """Returns header + payload, compressed only when that actually saves space."""
+    if len(data) < COMPRESSION_MIN_BYTES:
+        return RAW + data
+    if COMPRESSION_CODEC == "zstd" and zstandard is not None:
+        header, packed = ZSTD, zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(data)
+    else:
+        header, packed = ZLIB, zlib.compress(data, COMPRESSION_LEVEL)
+    if len(packed) >= len(data):
+        return RAW + data
+    return header + packed
+
+
+def decompress(blob):
+    blob = bytes(blob)
+    header, payload = blob[:1], blob[1:]
+    if header == RAW:
+        return payload
+    if header == ZLIB:
+        return zlib.decompress(payload)
+    if header == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("This value is zstd-compressed; install zstandard to read it.")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unknown compression header: {header!r}")
+
+
+class Packed(bytes):
+    """A stored value as loaded from the database, not decompressed yet."""
+
+
+class CompressedAttribute(DeferredAttribute):
+    """Decompresses on first attribute access, so rows that are loaded but never read stay cheap."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, Packed):
+            value = self.field.decode(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # A data descriptor, so __get__ runs even once the value is in __dict__
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedField(models.Field):
+    """
+    Base for fields stored as a BLOB with a 1-byte codec header.
+    Subclasses define encode (value -> bytes) and decode (bytes -> value).
+    Legacy rows that still hold plain text are read as they are.
+    values()/values_list() bypass the descriptor and return Packed bytes;
+    use field.decode() on those, or load model instances instead.
+    """
+    descriptor_class = CompressedAttribute
+
+    def get_internal_type(self):
+        return "BinaryField"
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            return self.from_text(value)
+        return Packed(value)
+
+    def pre_save(self, model_instance, add):
+        # Read around the descriptor: an untouched value is written back still compressed
+        return model_instance.__dict__.get(self.attname)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        if isinstance(value, Packed):
+            return bytes(value)
+        return compress(self.encode(value))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return None
+        return connection.Database.Binary(value)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+
+class CompressedTextField(CompressedField):
+    def encode(self, value):
+        return str(value).encode("utf-8")
+
+    def decode(self, blob):
+        return decompress(blob).decode("utf-8")
+
+    def from_text(self, value):
+        return value
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        if isinstance(value, Packed):
+            return self.decode(value)
+        return str(value)
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{"form_class": forms.CharField, "widget": forms.Textarea, **kwargs})
+
+
+class CompressedJSONField(CompressedField):
+    def encode(self, value):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, blob):
+        return json.loads(decompress(blob))
+
+    def from_text(self, value):
+        return json.loads(value)
+
+    def to_python(self, value):
+        if isinstance(value, Packed):
+            return self.decode(value)
+        return value
+
+    def value_to_string(self, obj):
+        return json.dumps(self.value_from_object(obj), ensure_ascii=False)
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{"form_class": forms.JSONField, **kwargs})
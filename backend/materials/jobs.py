@@ -0,0 +1,334 @@
+# jobs.py
+
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job, Segment
+from .quiz import generate_quiz_from_summary
+from .segmentation import segment_text, enrich_segments
+from .serializers import MaterialSerializer
+from .summarization import summarize_text
+
+# Worker threads per process; no external broker is needed
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Running jobs are marked alive this often by the process running them
+JOB_HEARTBEAT = int(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+# Jobs whose process hasn't marked them for this long died with that process
+JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER_SECONDS", "120"))
+
+HANDLERS = {}
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+# Job ids this process has submitted and not yet finished
+_local_jobs = set()
+_local_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler once the job has been cancelled."""
+
+
+def job_handler(kind):
+    """Registers a function(job) -> result as the handler for a job kind."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def _get_executor():
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+            _executor_pid = pid
+            with _local_lock:
+                _local_jobs.clear()
+            threading.Thread(target=_heartbeat_loop, args=(pid,), name="job-heartbeat", daemon=True).start()
+            started = True
+        else:
+            started = False
+    if started:
+        recover_stale()
+    return _executor
+
+
+def _submit(job_id):
+    with _local_lock:
+        _local_jobs.add(job_id)
+    _executor.submit(_run, job_id)
+
+
+def _local_ids():
+    with _local_lock:
+        return list(_local_jobs)
+
+
+def _heartbeat_loop(pid):
+    """Marks this process's running jobs alive and periodically recovers abandoned ones."""
+    while _executor_pid == pid:
+        time.sleep(JOB_HEARTBEAT)
+        try:
+            local = _local_ids()
+            if local:
+                Job.objects.filter(id__in=local, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+            recover_stale()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            close_old_connections()
+
+
+def _stale(now=None):
+    """Filter for jobs nobody is working on: dead heartbeat, or queued and never picked up."""
+    cutoff = (now or timezone.now()) - timedelta(seconds=JOB_STALE_AFTER)
+    running = Q(status=Job.RUNNING) & (
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    return running | Q(status=Job.QUEUED, created_at__lt=cutoff)
+
+
+def recover_stale(job_ids=None):
+    """
+    Picks up work left behind by a dead process: running jobs whose heartbeat
+    stopped are failed, and queued ones nobody ran are resubmitted here
+    (claiming makes double pickup harmless). Pass job_ids to check only those,
+    e.g. when a client polls a job.
+    """
+    jobs = Job.objects.filter(_stale()).exclude(id__in=_local_ids())
+    if job_ids is not None:
+        jobs = jobs.filter(id__in=job_ids)
+
+    jobs.filter(status=Job.RUNNING).update(
+        status=Job.FAILED, error="Worker stopped before the job finished.", finished_at=timezone.now()
+    )
+    queued = list(jobs.filter(status=Job.QUEUED).values_list("id", flat=True))
+    if queued:
+        _get_executor()
+        for job_id in queued:
+            _submit(job_id)
+
+
+def enqueue(user, kind, material=None, params=None, progress=None):
+    """Creates a queued job and hands it to the worker pool once committed."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    job = Job.objects.create(
+        user=user, material=material, kind=kind, params=params or {}, progress=progress or {}
+    )
+    _get_executor()
+    transaction.on_commit(lambda: _submit(job.id))
+    return job
+
+
+def raise_if_cancelled(job):
+    """Handlers call this before expensive steps and before saving results."""
+    if Job.objects.filter(id=job.id, cancel_requested=True).exists():
+        raise JobCancelled()
+
+
+def cancel(job):
+    """
+    Cancels a job. Queued jobs stop immediately; running jobs are flagged and
+    stop at their next checkpoint, without writing results into Material.
+    Running jobs whose worker has died are cancelled right away.
+    """
+    if Job.objects.filter(id=job.id, status=Job.QUEUED).update(
+        status=Job.CANCELLED, cancel_requested=True, finished_at=timezone.now()
+    ):
+        return True
+    abandoned = Job.objects.filter(_stale(), id=job.id, status=Job.RUNNING).exclude(id__in=_local_ids())
+    if abandoned.update(status=Job.CANCELLED, cancel_requested=True, finished_at=timezone.now()):
+        return True
+    return bool(
+        Job.objects.filter(id=job.id, status=Job.RUNNING).update(cancel_requested=True)
+    )
+
+
+def _finish(job_id, status, result=None, error=""):
+    Job.objects.filter(id=job_id, status=Job.RUNNING).update(
+        status=status, result=result, error=error, finished_at=timezone.now()
+    )
+
+
+def _run(job_id):
+    try:
+        # Claim atomically so a job only ever runs once
+        now = timezone.now()
+        if not Job.objects.filter(id=job_id, status=Job.QUEUED, cancel_requested=False).update(
+            status=Job.RUNNING, started_at=now, heartbeat_at=now
+        ):
+            return
+
+        job = Job.objects.select_related("material", "user").get(id=job_id)
+        try:
+            result = HANDLERS[job.kind](job)
+        except JobCancelled:
+            _finish(job_id, Job.CANCELLED)
+        except Exception as e:
+            traceback.print_exc()
+            _finish(job_id, Job.FAILED, error=str(e) or e.__class__.__name__)
+        else:
+            _finish(job_id, Job.SUCCEEDED, result=result)
+    finally:
+        with _local_lock:
+            _local_jobs.discard(job_id)
+        close_old_connections()
+
+
+# --- HANDLERS ---
+# Each returns the same body the synchronous endpoint would have returned.
+
+@job_handler("segment")
+def _segment(job):
+    material = job.material
+    segmented = segment_text(material.raw_text, engine=job.params.get("engine"))
+
+    raise_if_cancelled(job)
+    material.set_segments(segmented)
+    return MaterialSerializer(material).data
+
+
+@job_handler("enrich")
+def _enrich(job):
+    material = job.material
+    rows = list(material.segments.all())
+    if not rows:
+        raise RuntimeError("Material has no segments to enrich.")
+
+    enriched = enrich_segments([row.as_dict() for row in rows])
+
+    raise_if_cancelled(job)
+    # Only explanation/example change; the rest of each row stays untouched
+    for row, segment in zip(rows, enriched):
+        row.explanation = segment.get("explanation", "")
+        row.example = segment.get("example", "")
+    Segment.objects.bulk_update(rows, ["explanation", "example"])
+    material.touch()
+    return MaterialSerializer(material).data
+
+
+@job_handler("summarize")
+def _summarize(job):
+    material = job.material
+    summary_obj = summarize_text(
+        material.raw_text, long_document=job.params.get("long_document"), engine=job.params.get("engine")
+    )
+    summary_text = summary_obj.get("summary") if isinstance(summary_obj, dict) else str(summary_obj)
+
+    raise_if_cancelled(job)
+    material.summary_data = {"summary": summary_text}
+    material.save(update_fields=["summary_data"])
+    return {"summary": summary_text, "id": material.id, "compaction": summary_obj.get("compaction")}
+
+
+@job_handler("quiz")
+def _quiz(job):
+    material = job.material
+    summary_text = material.summary_data.get("summary", "") if isinstance(material.summary_data, dict) else ""
+    quiz_result = generate_quiz_from_summary(summary_text, num_questions=job.params.get("num_questions", 5))
+
+    if not quiz_result:
+        raise RuntimeError("Quiz could not be generated from the summary.")
+
+    raise_if_cancelled(job)
+    material.quiz_data = quiz_result
+    material.save(update_fields=["quiz_data"])
+    return {"quiz": quiz_result}
+
+
+@job_handler("pipeline")
+def _pipeline(job):
+    """
+    Ingest pipeline for a freshly created material: segmentation and
+    summarization run concurrently, then the quiz is generated from the
+    summary. Each result is written to its own Material column once, and
+    job.progress reports every stage as pending/running/done/failed.
+    """
+    material = job.material
+    text = material.raw_text
+    params = job.params
+
+    progress = {"extract": "done", "segment": "pending", "summarize": "pending", "quiz": "pending"}
+    lock = threading.Lock()
+
+    def set_stage(stage, state):
+        with lock:
+            progress[stage] = state
+            Job.objects.filter(id=job.id).update(progress=dict(progress), heartbeat_at=timezone.now())
+
+    def save_field(field):
+        def save(value):
+            setattr(material, field, value)
+            material.save(update_fields=[field])
+        return save
+
+    def run_stage(stage, func, save):
+        try:
+            set_stage(stage, "running")
+            value = func()
+            raise_if_cancelled(job)
+            save(value)
+            set_stage(stage, "done")
+            return value
+        except JobCancelled:
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            set_stage(stage, "failed")
+            return e
+        finally:
+            close_old_connections()
+
+    def segment():
+        return segment_text(text, engine=params.get("segment_engine"))
+
+    def summarize():
+        summary_obj = summarize_text(
+            text, long_document=params.get("long_document"), engine=params.get("summary_engine")
+        )
+        return {"summary": summary_obj.get("summary", "")}
+
+    set_stage("extract", "done")
+    raise_if_cancelled(job)
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="pipeline") as stages:
+        segmented = stages.submit(run_stage, "segment", segment, material.set_segments)
+        summary = stages.submit(run_stage, "summarize", summarize, save_field("summary_data"))
+        segmented, summary = segmented.result(), summary.result()
+
+    quiz = None
+    if isinstance(summary, dict) and summary.get("summary"):
+        def make_quiz():
+            questions = generate_quiz_from_summary(summary["summary"], num_questions=params.get("num_questions", 5))
+            if not questions:
+                raise RuntimeError("Quiz could not be generated from the summary.")
+            return questions
+
+        quiz = run_stage("quiz", make_quiz, save_field("quiz_data"))
+    else:
+        set_stage("quiz", "failed")
+
+    failed = [stage for stage, state in progress.items() if state == "failed"]
+    if "segment" in failed and "summarize" in failed:
+        raise RuntimeError(f"Pipeline failed: {segmented}; {summary}")
+
+    return {
+        "id": material.id,
+        "segmented_data": segmented if isinstance(segmented, list) else None,
+        "summary": summary.get("summary") if isinstance(summary, dict) else None,
+        "quiz": quiz if isinstance(quiz, list) else None,
+        "failed_stages": failed,
+    }
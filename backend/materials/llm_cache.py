@@ -0,0 +1,145 @@
+# llm_cache.py
+
+import hashlib
+import json
+import os
+from datetime import timedelta
+
+from django.db import DatabaseError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .caching import LRUCache, CacheStats
+from .models import LLMCacheEntry
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "512"))
+LLM_CACHE_TTL_DAYS = int(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Run the (relatively expensive) size check once every N stores
+LLM_CACHE_PRUNE_EVERY = int(os.getenv("LLM_CACHE_PRUNE_EVERY", "50"))
+
+_memory = LRUCache(maxsize=LLM_CACHE_MEMORY_ITEMS)
+stats = CacheStats("memory_hits", "db_hits", "misses", "stores", "evictions")
+
+
+def cache_key(payload):
+    """
+    Content-addressed key for a chat completion request:
+    hash of (model, messages incl. system prompt and input text, temperature, max_tokens).
+    """
+    material = {
+        "model": payload.get("model"),
+        "messages": payload.get("messages"),
+        "temperature": payload.get("temperature"),
+        "max_tokens": payload.get("max_tokens"),
+    }
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def lookup(key):
+    """Returns the cached completion text for a key, or None."""
+    if not LLM_CACHE_ENABLED:
+        return None
+
+    value = _memory.get(key)
+    if value is not None:
+        stats.incr("memory_hits")
+        return value
+
+    now = timezone.now()
+    try:
+        entry = LLMCacheEntry.objects.filter(key=key, expires_at__gt=now).only("response").first()
+        if entry is None:
+            stats.incr("misses")
+            return None
+        LLMCacheEntry.objects.filter(key=key).update(hits=F("hits") + 1, last_used_at=now)
+    except DatabaseError:
+        # The cache must never take an LLM call down with it
+        stats.incr("misses")
+        return None
+
+    stats.incr("db_hits")
+    stats.incr("evictions", _memory.set(key, entry.response))
+    return entry.response
+
+
+def store(key, response, model=""):
+    """Stores a completion in both tiers."""
+    if not LLM_CACHE_ENABLED:
+        return
+
+    stats.incr("evictions", _memory.set(key, response))
+
+    now = timezone.now()
+    try:
+        LLMCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                "model": model or "",
+                "response": response,
+                "size": len(response.encode("utf-8")),
+                "last_used_at": now,
+                "expires_at": now + timedelta(days=LLM_CACHE_TTL_DAYS),
+            },
+        )
+    except DatabaseError:
+        return
+
+    stats.incr("stores")
+    if stats.snapshot()["stores"] % LLM_CACHE_PRUNE_EVERY == 0:
+        prune()
+
+
+def invalidate(key):
+    """Drops an entry, e.g. when the cached completion turned out to be unusable."""
+    _memory.delete(key)
+    try:
+        LLMCacheEntry.objects.filter(key=key).delete()
+    except DatabaseError:
+        pass
+
+
+def prune():
+    """
+    Deletes expired rows, then least recently used rows until the
+    persistent tier is back under LLM_CACHE_MAX_BYTES.
+    Returns the number of rows deleted.
+    """
+    deleted, _ = LLMCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+
+    total = LLMCacheEntry.objects.aggregate(total=Sum("size"))["total"] or 0
+    if total <= LLM_CACHE_MAX_BYTES:
+        return deleted
+
+    to_free = total - LLM_CACHE_MAX_BYTES
+    victims = []
+    for key, size in LLMCacheEntry.objects.order_by("last_used_at").values_list("key", "size").iterator():
+        victims.append(key)
+        to_free -= size
+        if to_free <= 0:
+            break
+
+    for key in victims:
+        _memory.delete(key)
+    removed, _ = LLMCacheEntry.objects.filter(key__in=victims).delete()
+    stats.incr("evictions", removed)
+    return deleted + removed
+
+
+def report():
+    """Hit/miss counters plus the size of both tiers."""
+    counters = stats.snapshot()
+    lookups = counters["memory_hits"] + counters["db_hits"] + counters["misses"]
+    hits = counters["memory_hits"] + counters["db_hits"]
+    persistent = LLMCacheEntry.objects.aggregate(total=Sum("size"))
+
+    return {
+        **counters,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "memory_items": len(_memory),
+        "db_items": LLMCacheEntry.objects.count(),
+        "db_bytes": persistent["total"] or 0,
+    }
@@ -0,0 +1,223 @@
+# llm_client.py
+
+import os
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from . import llm_cache
+
+# Load environment variables from .env
+load_dotenv()
+
+GROQ_API_BASE = os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1")
+
+# Timeouts are (connect, read) in seconds
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+
+# Retry policy for 429 / 5xx / connection errors
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+
+# Keep-alive connections kept per process
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+
+# Upper bound on concurrent LLM calls fanned out by one process
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "4"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+_executor = None
+_executor_pid = None
+
+
+class GroqAPIError(Exception):
+    """Raised when Groq cannot be reached or keeps returning an error."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def get_session():
+    """
+    Returns the pooled Session for this process.
+    A new one is created after a fork so gunicorn workers never share sockets.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=LLM_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+            _session_pid = pid
+    return _session
+
+
+def _retry_after_seconds(response):
+    """Parses a Retry-After header given either as seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(attempt, response=None):
+    """Full-jitter exponential backoff, overridden by Retry-After when present."""
+    if response is not None:
+        retry_after = _retry_after_seconds(response)
+        if retry_after is not None:
+            return min(retry_after, LLM_BACKOFF_MAX)
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+def post_chat_completion(payload, api_key, timeout=None, stream=False):
+    """
+    POSTs a chat completion request through the shared session.
+    Retries 429/5xx and connection errors, then returns the successful Response.
+    """
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    timeout = timeout or (LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT)
+    session = get_session()
+
+    attempt = 0
+    while True:
+        try:
+            response = session.post(
+                f"{GROQ_API_BASE}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=timeout,
+                stream=stream,
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= LLM_MAX_RETRIES:
+                raise GroqAPIError(f"Groq API error: {e}") from e
+            time.sleep(_backoff_delay(attempt))
+            attempt += 1
+            continue
+
+        if response.status_code == 200:
+            return response
+
+        if response.status_code in RETRY_STATUSES and attempt < LLM_MAX_RETRIES:
+            delay = _backoff_delay(attempt, response)
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        raise GroqAPIError(f"Groq API error: {response.text}", status_code=response.status_code)
+
+
+def chat_completion(payload, api_key, timeout=None, cache=True):
+    """
+    Sends a chat completion request and returns the message content.
+    Identical requests are answered from the LLM response cache.
+    """
+    key = llm_cache.cache_key(payload) if cache else None
+    if key:
+        cached = llm_cache.lookup(key)
+        if cached is not None:
+            return cached
+
+    response = post_chat_completion(payload, api_key, timeout=timeout)
+    data = response.json()
+    content = data["choices"][0]["message"]["content"]
+
+    if key:
+        llm_cache.store(key, content, model=payload.get("model", ""))
+    return content
+
+
+def stream_chat_completion(payload, api_key, timeout=None, cache=True):
+    """
+    Streams a chat completion and yields content deltas as they arrive.
+    A cache hit is yielded as a single delta. Only a stream that reaches
+    [DONE] is cached; one that just stops may be cut short.
+    """
+    key = llm_cache.cache_key(payload) if cache else None
+    if key:
+        cached = llm_cache.lookup(key)
+        if cached is not None:
+            yield cached
+            return
+
+    response = post_chat_completion({**payload, "stream": True}, api_key, timeout=timeout, stream=True)
+    parts = []
+    done = False
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                done = True
+                break
+            try:
+                delta = json.loads(data)["choices"][0]["delta"].get("content")
+            except (ValueError, KeyError, IndexError):
+                continue
+            if delta:
+                parts.append(delta)
+                yield delta
+    except requests.RequestException as e:
+        raise GroqAPIError(f"Groq API error: {e}") from e
+    finally:
+        response.close()
+
+    if key and done:
+        llm_cache.store(key, "".join(parts), model=payload.get("model", ""))
+
+
+def get_executor():
+    """Returns the bounded thread pool used to fan out LLM calls in this process."""
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    with _session_lock:
+        if _executor is None or _executor_pid != pid:
+            _executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="llm")
+            _executor_pid = pid
+    return _executor
+
+
+def map_concurrently(func, items):
+    """
+    Runs func over items on the shared LLM pool and returns results in input order.
+    Must not be called from inside a task already running on that pool.
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    return list(get_executor().map(func, items))
@@ -0,0 +1,70 @@
+# local_segmentation.py
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .chunking import chunk_words
+
+MIN_KEY_TERMS = 3
+MAX_KEY_TERMS = 6
+
+
+def _top_terms(matrix, vocabulary, k):
+    """
+    Top-k terms per row of a CSR TF-IDF matrix, read straight off its
+    data/indices arrays. Unigrams already covered by a chosen bigram are skipped.
+    """
+    results = []
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        weights = matrix.data[start:end]
+        columns = matrix.indices[start:end]
+        order = columns[np.argsort(-weights, kind="stable")]
+
+        terms = []
+        for column in order:
+            term = vocabulary[column]
+            if any(term in chosen.split() or chosen in term.split() for chosen in terms):
+                continue
+            terms.append(term)
+            if len(terms) == k:
+                break
+        results.append(terms)
+    return results
+
+
+def extract_key_terms(chunks, k=5):
+    """
+    Key terms for every chunk from a single corpus-level TF-IDF matrix,
+    so a term that appears everywhere in the document ranks below one that
+    characterizes its own chunk.
+    """
+    k = max(MIN_KEY_TERMS, min(MAX_KEY_TERMS, k))
+    vectorizer = TfidfVectorizer(
+        stop_words="english",
+        ngram_range=(1, 2),
+        token_pattern=r"(?u)\b[a-zA-Z][a-zA-Z-]{2,}\b",
+        sublinear_tf=True,
+    )
+    try:
+        matrix = vectorizer.fit_transform(chunks).tocsr()
+    except ValueError:
+        # Empty vocabulary (only stop words / numbers)
+        return [[] for _ in chunks]
+    return _top_terms(matrix, vectorizer.get_feature_names_out(), k)
+
+
+def segment_text_local(cleaned_text, key_terms=5):
+    """
+    Splits text into ~80–250 word segments on sentence boundaries and picks
+    key terms locally. Same schema as the LLM segmenter, with explanation
+    and example left empty for an optional enrichment pass.
+    """
+    chunks = chunk_words(cleaned_text)
+    if not chunks:
+        return []
+
+    return [
+        {"segment": chunk, "explanation": "", "key_terms": terms, "example": ""}
+        for chunk, terms in zip(chunks, extract_key_terms(chunks, k=key_terms))
+    ]
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from materials import fields
+from materials.models import Material
+
+COLUMNS = ("raw_text", "segmented_data", "summary_data", "quiz_data")
+
+
+class Command(BaseCommand):
+    help = "Measures compression ratio and encode/decode time of the compressed Material columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=200, help="Materials to sample (newest first).")
+        parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per value.")
+
+    def handle(self, *args, limit, repeat, **options):
+        codec = fields.COMPRESSION_CODEC if fields.zstandard is not None else "zlib"
+        self.stdout.write(
+            f"codec={codec} level={fields.COMPRESSION_LEVEL} min_bytes={fields.COMPRESSION_MIN_BYTES}"
+        )
+
+        totals = {column: {"values": 0, "plain": 0, "stored": 0, "encode": 0.0, "decode": 0.0} for column in COLUMNS}
+        for material in Material.objects.only("id", *COLUMNS).order_by("-created_at")[:limit]:
+            for column in COLUMNS:
+                field = Material._meta.get_field(column)
+                value = getattr(material, column)
+                if value is None:
+                    continue
+
+                plain = field.encode(value)
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    stored = fields.compress(plain)
+                encoded = time.perf_counter()
+                for _ in range(repeat):
+                    field.decode(stored)
+                decoded = time.perf_counter()
+
+                row = totals[column]
+                row["values"] += 1
+                row["plain"] += len(plain)
+                row["stored"] += len(stored)
+                row["encode"] += (encoded - started) / repeat
+                row["decode"] += (decoded - encoded) / repeat
+
+        self.stdout.write(f"{'column':<16}{'values':>8}{'plain KiB':>12}{'stored KiB':>12}{'ratio':>8}{'enc ms':>10}{'dec ms':>10}")
+        for column, row in totals.items():
+            ratio = row["plain"] / row["stored"] if row["stored"] else 0.0
+            self.stdout.write(
+                f"{column:<16}{row['values']:>8}{row['plain'] / 1024:>12.1f}{row['stored'] / 1024:>12.1f}"
+                f"{ratio:>8.2f}{row['encode'] * 1000:>10.2f}{row['decode'] * 1000:>10.2f}"
+            )
@@ -0,0 +1,91 @@
+import gzip
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from materials import middleware, renderers
+from materials.models import Material
+from materials.serializers import MaterialSerializer
+
+
+def _timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - started) / repeat
+
+
+class Command(BaseCommand):
+    help = "Compares JSON encode time and response bytes (plain, gzip, brotli) on real material payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=50, help="Materials to sample (largest text first).")
+        parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per payload.")
+
+    def handle(self, *args, limit, repeat, **options):
+        self.stdout.write(
+            f"orjson={'yes' if renderers.orjson is not None else 'no'} "
+            f"brotli={'yes' if middleware.brotli is not None else 'no'} "
+            f"gzip_level={middleware.RESPONSE_GZIP_LEVEL} brotli_quality={middleware.RESPONSE_BROTLI_QUALITY}"
+        )
+
+        materials = Material.objects.prefetch_related("segments").order_by("-word_count")[:limit]
+        payloads = [MaterialSerializer(material).data for material in materials]
+        if not payloads:
+            self.stdout.write("No materials to sample.")
+            return
+
+        totals = {
+            "payloads": len(payloads), "bytes": 0, "gzip": 0, "brotli": 0,
+            "drf": 0.0, "fast": 0.0, "parse_drf": 0.0, "parse_fast": 0.0, "gzip_ms": 0.0, "brotli_ms": 0.0,
+        }
+        drf, fast = JSONRenderer(), renderers.FastJSONRenderer()
+        for data in payloads:
+            body, elapsed = _timed(lambda: drf.render(data), repeat)
+            totals["drf"] += elapsed
+            fast_body, elapsed = _timed(lambda: fast.render(data), repeat)
+            totals["fast"] += elapsed
+            if fast_body != body:
+                self.stdout.write(self.style.WARNING("⚠️ Renderers disagree on a payload"))
+            totals["bytes"] += len(body)
+
+            _, elapsed = _timed(lambda: JSONParser().parse(io.BytesIO(body)), repeat)
+            totals["parse_drf"] += elapsed
+            _, elapsed = _timed(lambda: renderers.FastJSONParser().parse(io.BytesIO(body)), repeat)
+            totals["parse_fast"] += elapsed
+
+            packed, elapsed = _timed(
+                lambda: gzip.compress(body, compresslevel=middleware.RESPONSE_GZIP_LEVEL, mtime=0), repeat
+            )
+            totals["gzip"] += len(packed)
+            totals["gzip_ms"] += elapsed
+            if middleware.brotli is not None:
+                packed, elapsed = _timed(
+                    lambda: middleware.brotli.compress(body, quality=middleware.RESPONSE_BROTLI_QUALITY), repeat
+                )
+                totals["brotli"] += len(packed)
+                totals["brotli_ms"] += elapsed
+
+        kib = totals["bytes"] / 1024
+        self.stdout.write(f"payloads={totals['payloads']} json={kib:.1f} KiB")
+        self.stdout.write(
+            f"encode ms   drf={totals['drf'] * 1000:.2f} fast={totals['fast'] * 1000:.2f} "
+            f"speedup={totals['drf'] / totals['fast'] if totals['fast'] else 0:.1f}x"
+        )
+        self.stdout.write(
+            f"parse ms    drf={totals['parse_drf'] * 1000:.2f} fast={totals['parse_fast'] * 1000:.2f} "
+            f"speedup={totals['parse_drf'] / totals['parse_fast'] if totals['parse_fast'] else 0:.1f}x"
+        )
+        self.stdout.write(
+            f"gzip        {totals['gzip'] / 1024:.1f} KiB ({totals['gzip'] / totals['bytes']:.1%}) "
+            f"in {totals['gzip_ms'] * 1000:.2f} ms"
+        )
+        if middleware.brotli is not None:
+            self.stdout.write(
+                f"brotli      {totals['brotli'] / 1024:.1f} KiB ({totals['brotli'] / totals['bytes']:.1%}) "
+                f"in {totals['brotli_ms'] * 1000:.2f} ms"
+            )
+
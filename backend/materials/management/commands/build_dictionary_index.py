@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from materials.offline_dictionary import write_index
+
+# WordNet's lists of irregular forms, one "form lemma [lemma ...]" per line
+EXCEPTION_FILES = ("noun.exc", "verb.exc", "adj.exc", "adv.exc")
+
+
+def wordnet_entries(wn):
+    """(key, lemma, meaning, example) for every WordNet lemma and irregular form."""
+    for name in wn.all_lemma_names():
+        synsets = wn.synsets(name)
+        if not synsets:
+            continue
+        # synsets() lists the most common sense first
+        first = synsets[0]
+        examples = first.examples()
+        yield name.replace("_", " "), "", first.definition(), examples[0] if examples else ""
+
+    # Irregular inflections (went -> go, mice -> mouse) point at their lemma.
+    # Read from the corpus files, since the reader only keeps them in a private map.
+    for fileid in EXCEPTION_FILES:
+        with wn.open(fileid) as f:
+            for line in f:
+                form, *lemmas = line.split()
+                if lemmas:
+                    yield form.replace("_", " "), lemmas[0].replace("_", " "), "", ""
+
+
+class Command(BaseCommand):
+    help = "Compiles WordNet (via nltk) into the memory-mapped offline dictionary index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=settings.DICTIONARY_INDEX_PATH, help="Index file to write.")
+
+    def handle(self, *args, output, **options):
+        from nltk.corpus import wordnet as wn
+
+        started = time.perf_counter()
+        try:
+            wn.ensure_loaded()
+        except LookupError:
+            raise CommandError("WordNet data not found. Run: python -m nltk.downloader wordnet omw-1.4")
+
+        count = write_index(output, wordnet_entries(wn))
+        self.stdout.write(f"Wrote {count} entries to {output} in {time.perf_counter() - started:.1f}s")
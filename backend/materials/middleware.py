@@ -0,0 +1,94 @@
+# middleware.py
+
+import gzip
+import os
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them isn't worth the CPU
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+# Brotli's default (11) is far too slow for on-the-fly responses
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+
+# Only API payloads. HTML pages (admin, DRF's browsable API) embed CSRF tokens,
+# and compressing secrets next to reflected input is what BREACH exploits.
+COMPRESSIBLE_TYPES = ("application/json",)
+
+_QVALUE = re.compile(r"(?:^|;)\s*q\s*=\s*([0-9.]+)")
+
+
+def accepted_encodings(header):
+    """{coding: q} from an Accept-Encoding header."""
+    codings = {}
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        match = _QVALUE.search(params)
+        try:
+            codings[name] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            codings[name] = 0.0
+    return codings
+
+
+def choose_encoding(header):
+    """The best coding we can produce for this client: "br", "gzip" or None."""
+    codings = accepted_encodings(header)
+    wildcard = codings.get("*", 0.0)
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = max(offered, key=lambda coding: codings.get(coding, wildcard))
+    return best if codings.get(best, wildcard) > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    Negotiated brotli/gzip compression for JSON responses of at least
+    RESPONSE_COMPRESSION_MIN_BYTES. Anything else, including streaming
+    responses (the SSE endpoints) and responses that set the CSRF cookie, is
+    passed through untouched.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").partition(";")[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES or settings.CSRF_COOKIE_NAME in response.cookies:
+            return response
+        if len(response.content) < RESPONSE_COMPRESSION_MIN_BYTES:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        coding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if coding is None:
+            return response
+
+        if coding == "br":
+            compressed = brotli.compress(response.content, quality=RESPONSE_BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(response.content, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        response.headers["Content-Encoding"] = coding
+        # The bytes now differ per encoding, so a strong ETag would be wrong
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        return response
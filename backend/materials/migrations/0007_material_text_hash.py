@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:37
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_text_hash(apps, schema_editor):
+    Material = apps.get_model("materials", "Material")
+    for material in Material.objects.only("id", "raw_text").iterator():
+        text_hash = hashlib.sha256((material.raw_text or "").encode("utf-8")).hexdigest()
+        Material.objects.filter(id=material.id).update(text_hash=text_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0006_job_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='text_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_text_hash, migrations.RunPython.noop),
+    ]
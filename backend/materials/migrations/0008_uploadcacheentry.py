@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0007_material_text_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadCacheEntry',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('ext', models.CharField(max_length=10)),
+                ('version', models.PositiveSmallIntegerField(default=1)),
+                ('cleaned_text', models.TextField()),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('source_bytes', models.PositiveBigIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _segment_fields(data):
+    if not isinstance(data, dict):
+        data = {"segment": data}
+    key_terms = data.get("key_terms") or []
+    return {
+        "segment": str(data.get("segment") or ""),
+        "explanation": str(data.get("explanation") or ""),
+        "key_terms": [str(term) for term in key_terms] if isinstance(key_terms, list) else [str(key_terms)],
+        "example": str(data.get("example") or ""),
+    }
+
+
+def split_segmented_data(apps, schema_editor):
+    """Moves list-shaped segmented_data into Segment rows; other shapes stay as JSON."""
+    Material = apps.get_model("materials", "Material")
+    Segment = apps.get_model("materials", "Segment")
+    for material in Material.objects.exclude(segmented_data=None).only("id", "segmented_data").iterator():
+        if not isinstance(material.segmented_data, list):
+            continue
+        Segment.objects.bulk_create(
+            Segment(material_id=material.id, position=position, **_segment_fields(data))
+            for position, data in enumerate(material.segmented_data)
+        )
+        Material.objects.filter(id=material.id).update(segmented_data=None)
+
+
+def join_segments(apps, schema_editor):
+    Material = apps.get_model("materials", "Material")
+    Segment = apps.get_model("materials", "Segment")
+    material_ids = Segment.objects.values_list("material_id", flat=True).distinct()
+    for material_id in material_ids:
+        segments = [
+            {"segment": s.segment, "explanation": s.explanation, "key_terms": s.key_terms, "example": s.example}
+            for s in Segment.objects.filter(material_id=material_id).order_by("position")
+        ]
+        Material.objects.filter(id=material_id).update(segmented_data=segments)
+    Segment.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0009_material_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Segment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('segment', models.TextField(blank=True)),
+                ('explanation', models.TextField(blank=True)),
+                ('key_terms', models.JSONField(blank=True, default=list)),
+                ('example', models.TextField(blank=True)),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='materials.material')),
+            ],
+            options={
+                'ordering': ['position'],
+                'unique_together': {('material', 'position')},
+            },
+        ),
+        migrations.RunPython(split_segmented_data, join_segments),
+    ]
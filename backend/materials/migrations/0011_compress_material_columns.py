@@ -0,0 +1,71 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:48
+
+import json
+
+import materials.fields
+from django.db import migrations, models
+
+COLUMNS = ("raw_text", "segmented_data", "summary_data", "quiz_data")
+
+
+def compress_existing(apps, schema_editor):
+    """Rewrites rows still holding plain text in the compressed format, and fills word_count."""
+    Material = apps.get_model("materials", "Material")
+    for material in Material.objects.only("id", *COLUMNS).iterator():
+        values = {column: getattr(material, column) for column in COLUMNS}
+        Material.objects.filter(id=material.id).update(
+            word_count=len((values["raw_text"] or "").split()), **values
+        )
+
+
+def decompress_existing(apps, schema_editor):
+    """Writes plain text/JSON back so the columns can become TEXT again."""
+    Material = apps.get_model("materials", "Material")
+    table = Material._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        for material in Material.objects.only("id", *COLUMNS).iterator():
+            raw_text = material.raw_text
+            json_values = [
+                None if getattr(material, column) is None else json.dumps(getattr(material, column))
+                for column in COLUMNS[1:]
+            ]
+            cursor.execute(
+                f"UPDATE {table} SET raw_text = %s, segmented_data = %s, summary_data = %s, quiz_data = %s WHERE id = %s",
+                [raw_text, *json_values, material.id],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0010_segment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='quiz_data',
+            field=materials.fields.CompressedJSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='raw_text',
+            field=materials.fields.CompressedTextField(),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='segmented_data',
+            field=materials.fields.CompressedJSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='summary_data',
+            field=materials.fields.CompressedJSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(compress_existing, decompress_existing),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+CREATE_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS materials_material_fts USING fts5(
+    owner, title, body, summary, key_terms,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+)
+"""
+DROP_SQL = "DROP TABLE IF EXISTS materials_material_fts"
+INSERT_SQL = (
+    "INSERT INTO materials_material_fts (rowid, owner, title, body, summary, key_terms) "
+    "VALUES (%s, %s, %s, %s, %s, %s)"
+)
+
+
+def create_index(apps, schema_editor):
+    """SQLite only: other databases simply get no full-text index."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    Material = apps.get_model("materials", "Material")
+    Segment = apps.get_model("materials", "Segment")
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        for material in Material.objects.only("id", "user_id", "title", "raw_text", "summary_data").iterator():
+            key_terms = Segment.objects.filter(material_id=material.id).values_list("key_terms", flat=True)
+            summary = material.summary_data
+            if isinstance(summary, dict):
+                summary = summary.get("summary")
+            cursor.execute(INSERT_SQL, [
+                material.id,
+                f"u{material.user_id}",
+                material.title or "",
+                material.raw_text or "",
+                str(summary or ""),
+                " ".join(str(term) for terms in key_terms for term in (terms or [])),
+            ])
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0011_compress_material_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0012_material_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DictionaryEntry',
+            fields=[
+                ('word', models.CharField(max_length=120, primary_key=True, serialize=False)),
+                ('meaning', models.TextField(blank=True)),
+                ('example', models.TextField(blank=True)),
+                ('found', models.BooleanField(default=True)),
+                ('source', models.CharField(blank=True, max_length=20)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
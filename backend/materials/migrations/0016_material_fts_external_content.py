@@ -0,0 +1,112 @@
+import json
+
+from django.db import migrations
+
+from materials.fields import decompress
+
+VIEW_SQL = """
+CREATE VIEW IF NOT EXISTS materials_material_search AS
+SELECT m.id AS id,
+       'u' || m.user_id AS owner,
+       m.title AS title,
+       materials_text(m.raw_text) AS body,
+       materials_summary(m.summary_data) AS summary,
+       (SELECT group_concat(terms, ' ') FROM (
+            SELECT materials_terms(s.key_terms) AS terms
+            FROM materials_segment s
+            WHERE s.material_id = m.id
+            ORDER BY s.position
+       )) AS key_terms
+FROM materials_material m
+"""
+CREATE_SQL = """
+CREATE VIRTUAL TABLE materials_material_fts USING fts5(
+    owner, title, body, summary, key_terms,
+    content = 'materials_material_search', content_rowid = 'id',
+    tokenize = 'porter unicode61 remove_diacritics 2'
+)
+"""
+REBUILD_SQL = "INSERT INTO materials_material_fts (materials_material_fts) VALUES ('rebuild')"
+DROP_VIEW_SQL = "DROP VIEW IF EXISTS materials_material_search"
+DROP_SQL = "DROP TABLE IF EXISTS materials_material_fts"
+
+# 0012's table, which kept its own uncompressed copy of every column
+STORED_CREATE_SQL = """
+CREATE VIRTUAL TABLE materials_material_fts_stored USING fts5(
+    owner, title, body, summary, key_terms,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+)
+"""
+STORED_FILL_SQL = """
+INSERT INTO materials_material_fts_stored (rowid, owner, title, body, summary, key_terms)
+SELECT id, owner, title, coalesce(body, ''), coalesce(summary, ''), coalesce(key_terms, '')
+FROM materials_material_search
+"""
+STORED_RENAME_SQL = "ALTER TABLE materials_material_fts_stored RENAME TO materials_material_fts"
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return decompress(value).decode("utf-8")
+
+
+def _summary(value):
+    if value is None:
+        return ""
+    data = json.loads(_text(value))
+    if isinstance(data, dict):
+        return str(data.get("summary") or "")
+    return str(data or "")
+
+
+def _terms(value):
+    if not value:
+        return ""
+    terms = json.loads(value)
+    if not isinstance(terms, list):
+        terms = [terms]
+    return " ".join(str(term) for term in terms)
+
+
+def _register_functions(schema_editor):
+    """The view needs these; the app registers its own copies on every connection at runtime."""
+    schema_editor.connection.ensure_connection()
+    dbapi_connection = schema_editor.connection.connection
+    for name, func in (("materials_text", _text), ("materials_summary", _summary), ("materials_terms", _terms)):
+        dbapi_connection.create_function(name, 1, func, deterministic=True)
+
+
+def use_external_content(apps, schema_editor):
+    """SQLite only: other databases simply get no full-text index."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    _register_functions(schema_editor)
+    schema_editor.execute(DROP_SQL)
+    schema_editor.execute(VIEW_SQL)
+    schema_editor.execute(CREATE_SQL)
+    schema_editor.execute(REBUILD_SQL)
+
+
+def use_stored_content(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    _register_functions(schema_editor)
+    schema_editor.execute(STORED_CREATE_SQL)
+    schema_editor.execute(STORED_FILL_SQL)
+    schema_editor.execute(DROP_SQL)
+    schema_editor.execute(DROP_VIEW_SQL)
+    schema_editor.execute(STORED_RENAME_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0015_job_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(use_external_content, use_stored_content),
+    ]
@@ -0,0 +1,44 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# Same view and functions as 0016; only the table definition changes
+external_content = import_module("materials.migrations.0016_material_fts_external_content")
+
+PREFIX_CREATE_SQL = """
+CREATE VIRTUAL TABLE materials_material_fts USING fts5(
+    owner, title, body, summary, key_terms,
+    content = 'materials_material_search', content_rowid = 'id',
+    tokenize = 'porter unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+
+def _recreate(schema_editor, create_sql):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    external_content._register_functions(schema_editor)
+    schema_editor.execute(external_content.DROP_SQL)
+    schema_editor.execute(create_sql)
+    schema_editor.execute(external_content.REBUILD_SQL)
+
+
+def add_prefix_index(apps, schema_editor):
+    """Short prefixes (search-as-you-type's last term) are answered from the index."""
+    _recreate(schema_editor, PREFIX_CREATE_SQL)
+
+
+def drop_prefix_index(apps, schema_editor):
+    _recreate(schema_editor, external_content.CREATE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0016_material_fts_external_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_prefix_index, drop_prefix_index),
+    ]
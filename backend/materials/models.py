@@ -1,26 +1,149 @@
-from django.db import models
+import hashlib
+import uuid
+
+from django.db import models, transaction
 from django.conf import settings
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .fields import CompressedJSONField, CompressedTextField
+
+# Sent by Material.set_segments, inside its transaction, which bulk-writes rows without pre_save/post_save
+segments_changing = Signal()
+segments_changed = Signal()
+
+
+def hash_text(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
 
 class Material(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="materials")
     title = models.CharField(max_length=255, blank=True)
-    raw_text = models.TextField()
+    # Large columns are stored zlib-compressed (see fields.py)
+    raw_text = CompressedTextField()
+    # SHA-256 of raw_text, so callers can skip rewriting unchanged text
+    text_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # Kept alongside the compressed text so listings don't have to decompress it
+    word_count = models.PositiveIntegerField(default=0, editable=False)
 
-    segmented_data = models.JSONField(null=True, blank=True)
-    summary_data = models.JSONField(null=True, blank=True)
-    quiz_data = models.JSONField(null=True, blank=True)
+    # Only non-list (legacy) segmentations; segment lists live in Segment rows
+    segmented_data = CompressedJSONField(null=True, blank=True)
+    summary_data = CompressedJSONField(null=True, blank=True)
+    quiz_data = CompressedJSONField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # Validator for conditional GETs; also bumped when segment rows change (see touch)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's library (see materials_list)
+            models.Index(fields=["user", "-created_at", "-id"], name="material_user_created_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields:
+            # auto_now only reaches the database when updated_at is written too
+            update_fields = kwargs["update_fields"] = {*update_fields, "updated_at"}
+        if update_fields is None or "raw_text" in update_fields:
+            self.text_hash = hash_text(self.raw_text)
+            self.word_count = len((self.raw_text or "").split())
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "text_hash", "word_count"}
+        # One transaction with the search index sync that the save signals do
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def text_changed(self, text):
+        return hash_text(text) != self.text_hash
+
+    def touch(self):
+        """Bumps updated_at for writes that bypass save(), such as segment rows."""
+        self.updated_at = timezone.now()
+        Material.objects.filter(id=self.id).update(updated_at=self.updated_at)
+
+    @property
+    def segment_payload(self):
+        """
+        The segmentation in its original `segmented_data` shape: a list of
+        segment dicts built from the Segment rows, else the legacy JSON.
+        Uses prefetched segments when available.
+        """
+        segments = [segment.as_dict() for segment in self.segments.all()]
+        if segments:
+            return segments
+        return self.segmented_data
+
+    def set_segments(self, segments):
+        """Replaces this material's segments with the given list of segment dicts."""
+        with transaction.atomic():
+            segments_changing.send(sender=Material, instance=self)
+            self.segments.all().delete()
+            Segment.objects.bulk_create(
+                Segment.from_dict(self, position, data) for position, data in enumerate(segments or [])
+            )
+            # Clear any legacy JSON without loading it if it was deferred
+            Material.objects.filter(id=self.id).exclude(segmented_data=None).update(segmented_data=None)
+            if "segmented_data" not in self.get_deferred_fields():
+                self.segmented_data = None
+            self.touch()
+            segments_changed.send(sender=Material, instance=self)
 
     def __str__(self):
         return self.title if self.title else f"Material {self.id}"
 
+class Segment(models.Model):
+    """One learning segment of a material, in reading order."""
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name="segments")
+    position = models.PositiveIntegerField()
+    segment = models.TextField(blank=True)
+    explanation = models.TextField(blank=True)
+    key_terms = models.JSONField(default=list, blank=True)
+    example = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ("material", "position")
+        ordering = ["position"]
+
+    @classmethod
+    def from_dict(cls, material, position, data):
+        if not isinstance(data, dict):
+            data = {"segment": data}
+        key_terms = data.get("key_terms") or []
+        return cls(
+            material=material,
+            position=position,
+            segment=str(data.get("segment") or ""),
+            explanation=str(data.get("explanation") or ""),
+            key_terms=[str(term) for term in key_terms] if isinstance(key_terms, list) else [str(key_terms)],
+            example=str(data.get("example") or ""),
+        )
+
+    def save(self, *args, **kwargs):
+        # One transaction with the search index sync that the save signals do
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def as_dict(self):
+        return {
+            "segment": self.segment,
+            "explanation": self.explanation,
+            "key_terms": self.key_terms,
+            "example": self.example,
+        }
+
+    def __str__(self):
+        return f"{self.material_id} #{self.position}"
+
 class Vocabulary(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     word = models.CharField(max_length=120)
     meaning = models.TextField()
     example = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("user", "word")
@@ -28,3 +151,95 @@ class Vocabulary(models.Model):
 
     def __str__(self):
         return f"{self.word} ({self.user})"
+
+class DictionaryEntry(models.Model):
+    """
+    Definition cache shared by all users (see dictionary.py).
+    found=False rows remember misses until they expire.
+    """
+    word = models.CharField(max_length=120, primary_key=True)
+    meaning = models.TextField(blank=True)
+    example = models.TextField(blank=True)
+    found = models.BooleanField(default=True)
+    source = models.CharField(max_length=20, blank=True)
+    hits = models.PositiveIntegerField(default=0)
+    fetched_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.word if self.found else f"{self.word} (not found)"
+
+
+class LLMCacheEntry(models.Model):
+    """Persistent tier of the LLM response cache (see llm_cache.py)."""
+    key = models.CharField(max_length=64, primary_key=True)
+    model = models.CharField(max_length=100, blank=True)
+    response = models.TextField()
+    size = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key[:12]} ({self.model})"
+
+
+class Job(models.Model):
+    """Background LLM work item, run by the in-process worker pool in jobs.py."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    STATUS_CHOICES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+        (CANCELLED, "Cancelled"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="jobs")
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, null=True, blank=True, related_name="jobs")
+    kind = models.CharField(max_length=30)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    params = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    # Per-stage state for multi-stage jobs, e.g. {"segment": "done", "quiz": "running"}
+    progress = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    cancel_requested = models.BooleanField(default=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed while a worker runs the job (see jobs.JOB_HEARTBEAT)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED, self.CANCELLED)
+
+    def __str__(self):
+        return f"{self.kind} {self.id} ({self.status})"
+
+class UploadCacheEntry(models.Model):
+    """Extracted + cleaned text of an uploaded file, keyed by SHA-256 of its bytes."""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    ext = models.CharField(max_length=10)
+    # Bumped when extraction/cleaning changes, so stale entries read as misses
+    version = models.PositiveSmallIntegerField(default=1)
+    cleaned_text = models.TextField()
+    size = models.PositiveIntegerField(default=0)
+    source_bytes = models.PositiveBigIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]}.{self.ext}"
@@ -0,0 +1,144 @@
+# ocr.py
+
+import os
+import time
+
+import numpy as np
+import pypdfium2 as pdfium
+import pytesseract
+from PIL import Image, ImageOps
+
+from .workers import get_process_pool
+
+# Path to the tesseract binary; leave unset when it's on PATH
+TESSERACT_CMD = os.getenv("TESSERACT_CMD", "tesseract")
+pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+# Tesseract is most accurate around 300 DPI; more pixels only cost time
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+# Without DPI metadata, assume the image is at most a letter page at the target DPI
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", str(11 * OCR_TARGET_DPI)))
+# Images taller than this are cut into bands at blank rows and OCR'd in parallel
+OCR_TILE_HEIGHT = int(os.getenv("OCR_TILE_HEIGHT", "1200"))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+# --psm 6: assume a uniform block of text (bands are already split by line)
+OCR_CONFIG = os.getenv("OCR_CONFIG", "--oem 1 --psm 6")
+
+
+def _otsu_threshold(gray):
+    histogram = np.bincount(np.asarray(gray, dtype=np.uint8).ravel(), minlength=256).astype(float)
+    total = histogram.sum()
+    levels = np.arange(256)
+
+    weight_bg = np.cumsum(histogram)
+    weight_fg = total - weight_bg
+    sum_bg = np.cumsum(histogram * levels)
+    mean_bg = np.divide(sum_bg, weight_bg, out=np.zeros(256), where=weight_bg > 0)
+    mean_fg = np.divide(sum_bg[-1] - sum_bg, weight_fg, out=np.zeros(256), where=weight_fg > 0)
+
+    between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between))
+
+
+def preprocess(img, dpi=None):
+    """
+    Downscales to OCR_TARGET_DPI, converts to grayscale and binarizes with
+    an Otsu threshold. Returns a 1-bit-looking "L" image.
+    """
+    img = ImageOps.exif_transpose(img)
+
+    scale = 1.0
+    if dpi and dpi > OCR_TARGET_DPI:
+        scale = OCR_TARGET_DPI / dpi
+    elif max(img.size) > OCR_MAX_SIDE:
+        scale = OCR_MAX_SIDE / max(img.size)
+    if scale < 1.0:
+        img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.LANCZOS)
+
+    gray = img.convert("L")
+    threshold = _otsu_threshold(gray)
+    return gray.point(lambda value: 255 if value > threshold else 0)
+
+
+def split_bands(img, tile_height=OCR_TILE_HEIGHT):
+    """
+    Cuts a binarized page into horizontal bands of roughly tile_height,
+    only at rows with no ink so no text line is split in half.
+    """
+    if img.height <= tile_height:
+        return [img]
+
+    ink_rows = (np.asarray(img) < 128).any(axis=1)
+    blank = np.flatnonzero(~ink_rows)
+
+    bands, top = [], 0
+    while img.height - top > tile_height:
+        target = top + tile_height
+        candidates = blank[(blank > top + tile_height // 2) & (blank <= target)]
+        cut = int(candidates[-1]) if len(candidates) else target
+        bands.append(img.crop((0, top, img.width, cut)))
+        top = cut
+    bands.append(img.crop((0, top, img.width, img.height)))
+    return bands
+
+
+class OCRError(Exception):
+    pass
+
+
+def ocr_image(img):
+    """Runs tesseract on an already preprocessed image."""
+    try:
+        return pytesseract.image_to_string(img, lang=OCR_LANG, config=OCR_CONFIG)
+    except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError) as e:
+        # pytesseract's exceptions can't be unpickled, which would break the process pool
+        raise OCRError(str(e)) from None
+
+
+def _dpi(img):
+    dpi = img.info.get("dpi")
+    try:
+        return float(dpi[0]) if dpi else None
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def ocr_upload(file):
+    """
+    OCRs an uploaded photo/scan: preprocess once, then OCR its bands in
+    parallel on the extraction process pool.
+    """
+    img = Image.open(file)
+    img.load()
+    bands = split_bands(preprocess(img, dpi=_dpi(img)))
+
+    if len(bands) == 1:
+        return ocr_image(bands[0])
+    return "\n".join(get_process_pool().map(ocr_image, bands))
+
+
+def ocr_pdf_page(path, index):
+    """
+    Renders one PDF page at OCR_TARGET_DPI and OCRs it.
+    Runs in a worker process; returns (index, text, milliseconds).
+    """
+    started = time.perf_counter()
+    pdf = pdfium.PdfDocument(path)
+    try:
+        page = pdf[index]
+        try:
+            img = page.render(scale=OCR_TARGET_DPI / 72, grayscale=True).to_pil()
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+
+    text = "\n".join(ocr_image(band) for band in split_bands(preprocess(img)))
+    return index, text, round((time.perf_counter() - started) * 1000, 2)
+
+
+def ocr_pdf_pages(path, indexes):
+    """OCRs the given (text-less) pages of a PDF in parallel."""
+    pool = get_process_pool()
+    futures = [pool.submit(ocr_pdf_page, path, index) for index in indexes]
+    return [future.result() for future in futures]
@@ -0,0 +1,160 @@
+# offline_dictionary.py
+
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+# File layout: MAGIC, record count (uint32), one uint64 offset per record,
+# then the records sorted by key bytes, each "key\tlemma\tmeaning\texample\n".
+# lemma is empty for real entries and names the target for inflected forms.
+MAGIC = b"PRDICT01"
+_COUNT = struct.Struct("<I")
+_OFFSET = struct.Struct("<Q")
+
+# WordNet's morphy detachment rules, tried in order
+SUBSTITUTIONS = (
+    # nouns
+    ("s", ""), ("ses", "s"), ("ves", "f"), ("xes", "x"), ("zes", "z"),
+    ("ches", "ch"), ("shes", "sh"), ("men", "man"), ("ies", "y"),
+    # verbs
+    ("ies", "y"), ("es", "e"), ("es", ""), ("ed", "e"), ("ed", ""), ("ing", "e"), ("ing", ""),
+    # adjectives
+    ("er", ""), ("est", ""), ("er", "e"), ("est", "e"),
+)
+
+_index = None
+_index_pid = None
+_index_lock = threading.Lock()
+
+
+def _clean(value):
+    return " ".join((value or "").split())
+
+
+def write_index(path, entries):
+    """
+    Writes an index file from (key, lemma, meaning, example) tuples.
+    Later duplicates of a key are dropped. The file is swapped in atomically,
+    so running workers keep reading the old one until they reopen.
+    """
+    records = {}
+    for key, lemma, meaning, example in entries:
+        key = _clean(key).lower()
+        if key and key not in records:
+            records[key] = "\t".join((key, _clean(lemma).lower(), _clean(meaning), _clean(example))).encode("utf-8") + b"\n"
+
+    ordered = [records[key] for key in sorted(records, key=lambda k: k.encode("utf-8"))]
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_COUNT.pack(len(ordered)))
+        offset = 0
+        for record in ordered:
+            f.write(_OFFSET.pack(offset))
+            offset += len(record)
+        for record in ordered:
+            f.write(record)
+    os.replace(tmp, path)
+    return len(ordered)
+
+
+class DictionaryIndex:
+    """
+    Read-only view of an index file. The file is memory-mapped, so every
+    worker process shares the same page-cache pages and a lookup is a
+    binary search over them, without loading the dictionary into memory.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a dictionary index")
+        (self.count,) = _COUNT.unpack_from(self._mm, len(MAGIC))
+        self._offsets_at = len(MAGIC) + _COUNT.size
+        self._data_at = self._offsets_at + self.count * _OFFSET.size
+
+    def _record_at(self, i):
+        (offset,) = _OFFSET.unpack_from(self._mm, self._offsets_at + i * _OFFSET.size)
+        start = self._data_at + offset
+        return start, self._mm.find(b"\n", start)
+
+    def _key_at(self, i):
+        start, end = self._record_at(i)
+        return self._mm[start:self._mm.find(b"\t", start, end)]
+
+    def get(self, key):
+        """Exact lookup; returns (lemma, meaning, example) or None."""
+        target = key.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.count or self._key_at(lo) != target:
+            return None
+
+        start, end = self._record_at(lo)
+        _, lemma, meaning, example = self._mm[start:end].decode("utf-8").split("\t")
+        return lemma, meaning, example
+
+    def _definition(self, key):
+        found = self.get(key)
+        if found is None:
+            return None
+        lemma, meaning, example = found
+        if lemma:
+            # Irregular form (e.g. "went"): follow it to its lemma
+            found = self.get(lemma)
+            if found is None:
+                return None
+            _, meaning, example = found
+        return meaning, example
+
+    def lookup(self, word):
+        """
+        Returns (lemma, meaning, example) for a normalized word, trying it as
+        written first, then its morphy-style base forms. None if unknown.
+        """
+        definition = self._definition(word)
+        if definition is not None:
+            return (word, *definition)
+
+        for suffix, replacement in SUBSTITUTIONS:
+            if word.endswith(suffix) and len(word) > len(suffix):
+                base = word[:-len(suffix)] + replacement
+                definition = self._definition(base)
+                if definition is not None:
+                    return (base, *definition)
+        return None
+
+    def close(self):
+        self._mm.close()
+
+
+def get_index():
+    """The index for this process, or None when no index file has been built."""
+    global _index, _index_pid
+
+    pid = os.getpid()
+    if _index_pid == pid:
+        return _index
+
+    with _index_lock:
+        if _index_pid != pid:
+            try:
+                # settings.DICTIONARY_INDEX_PATH, built by `manage.py build_dictionary_index`
+                _index = DictionaryIndex(settings.DICTIONARY_INDEX_PATH)
+            except (OSError, ValueError):
+                _index = None
+            _index_pid = pid
+    return _index
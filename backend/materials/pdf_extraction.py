@@ -0,0 +1,116 @@
+# pdf_extraction.py
+
+import os
+import time
+
+import pypdfium2 as pdfium
+
+from .ocr import OCRError, ocr_pdf_pages
+from .workers import get_process_pool
+
+# Pages handed to one worker at a time
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+# Documents up to this many pages are extracted in-process (pool overhead isn't worth it)
+PDF_INLINE_PAGES = int(os.getenv("PDF_INLINE_PAGES", "8"))
+# A page whose fast-path text is shorter than this is re-read with pdfplumber
+PDF_MIN_PAGE_CHARS = int(os.getenv("PDF_MIN_PAGE_CHARS", "20"))
+# OCR pages that have no text layer at all (scanned PDFs)
+PDF_OCR = os.getenv("PDF_OCR", "1") == "1"
+
+
+def needs_layout(text):
+    """
+    True when pdfium's plain text looks unusable: (almost) empty, or full of
+    replacement/control characters from broken font encodings.
+    """
+    stripped = text.strip()
+    if len(stripped) < PDF_MIN_PAGE_CHARS:
+        return True
+    bad = sum(1 for c in stripped if c == "�" or (ord(c) < 32 and c not in "\n\r\t"))
+    return bad / len(stripped) > 0.05
+
+
+def _pdfium_text(page):
+    textpage = page.get_textpage()
+    try:
+        return textpage.get_text_range().replace("\r\n", "\n")
+    finally:
+        textpage.close()
+
+
+def extract_page_range(path, start, end):
+    """
+    Extracts pages [start, end) once each. pypdfium2 is the fast path;
+    pdfplumber's layout analysis only runs for pages where that fails.
+    Returns a list of (index, text, engine, milliseconds).
+    """
+    results = []
+    plumber = None
+    pdf = pdfium.PdfDocument(path)
+    try:
+        for index in range(start, end):
+            started = time.perf_counter()
+            page = pdf[index]
+            try:
+                text = _pdfium_text(page)
+            finally:
+                page.close()
+            engine = "pdfium"
+
+            if needs_layout(text):
+                if plumber is None:
+                    import pdfplumber
+                    plumber = pdfplumber.open(path)
+                layout_text = plumber.pages[index].extract_text() or ""
+                if len(layout_text.strip()) > len(text.strip()):
+                    text, engine = layout_text, "pdfplumber"
+
+            results.append((index, text, engine, round((time.perf_counter() - started) * 1000, 2)))
+    finally:
+        pdf.close()
+        if plumber is not None:
+            plumber.close()
+    return results
+
+
+def page_count(path):
+    pdf = pdfium.PdfDocument(path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def extract_pdf(path):
+    """
+    Extracts every page of the PDF at path, spreading page ranges across a
+    process pool for large documents. Pages without a text layer are OCR'd.
+    Returns (pages, timings): page texts in order, and one
+    {"page", "engine", "ms"} entry per page.
+    """
+    total = page_count(path)
+    if total <= PDF_INLINE_PAGES:
+        rows = extract_page_range(path, 0, total)
+    else:
+        pool = get_process_pool()
+        futures = [
+            pool.submit(extract_page_range, path, start, min(start + PDF_PAGES_PER_TASK, total))
+            for start in range(0, total, PDF_PAGES_PER_TASK)
+        ]
+        rows = [row for future in futures for row in future.result()]
+
+    pages = [text for _, text, _, _ in rows]
+    timings = [{"page": index + 1, "engine": engine, "ms": ms} for index, _, engine, ms in rows]
+
+    scanned = [index for index, text in enumerate(pages) if len(text.strip()) < PDF_MIN_PAGE_CHARS]
+    if PDF_OCR and scanned:
+        try:
+            for index, text, ms in ocr_pdf_pages(path, scanned):
+                if len(text.strip()) > len(pages[index].strip()):
+                    pages[index] = text
+                    timings[index] = {"page": index + 1, "engine": "ocr", "ms": round(timings[index]["ms"] + ms, 2)}
+        except OCRError as e:
+            # Missing tesseract etc. shouldn't lose the pages that did have text
+            print("⚠️ OCR of scanned PDF pages failed:", e)
+
+    return pages, timings
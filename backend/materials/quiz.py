@@ -1,10 +1,11 @@
 import os
-import requests
 import json
 import re
 
+from . import llm_cache
+from .llm_client import chat_completion, GroqAPIError
+
 GROQ_QUIZ_KEY = os.getenv("GROQ_QUIZ_KEY")
-GROQ_API_BASE = os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1")
 MODEL = os.getenv("QUIZ_MODEL", "llama-3.1-8b-instant")
 
 def generate_quiz_from_summary(summary_text, num_questions=5):
@@ -34,26 +35,13 @@ def generate_quiz_from_summary(summary_text, num_questions=5):
     {summary_text}
     """
 
-    headers = {
-        "Authorization": f"Bearer {GROQ_QUIZ_KEY}",
-        "Content-Type": "application/json"
-    }
-
     payload = {
         "model": MODEL,
         "messages": [{"role": "user", "content": prompt}]
     }
 
     try:
-        response = requests.post(
-            f"{GROQ_API_BASE}/chat/completions",
-            headers=headers,
-            json=payload
-        )
-        response.raise_for_status()
-        result = response.json()
-
-        output_text = result["choices"][0]["message"]["content"]
+        output_text = chat_completion(payload, GROQ_QUIZ_KEY)
 
         # Remove ```json ... ``` code fences if present
         output_text = re.sub(r"^```json|```$", "", output_text.strip(), flags=re.MULTILINE)
@@ -70,8 +58,9 @@ def generate_quiz_from_summary(summary_text, num_questions=5):
 
         except json.JSONDecodeError:
             print("❌ Groq returned invalid JSON:", output_text)
+            llm_cache.invalidate(llm_cache.cache_key(payload))
             return None
 
-    except requests.RequestException as e:
+    except GroqAPIError as e:
         print("❌ Error calling Groq:", e)
         return None
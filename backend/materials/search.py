@@ -0,0 +1,179 @@
+# search.py
+
+import html
+import json
+import re
+
+from django.db import connection
+
+from .fields import decompress
+
+# FTS5 index kept in sync by signals.py; rowid is the material id. It is an
+# external-content table over VIEW_NAME, so the text itself is only stored
+# (compressed) in materials_material and read back for snippets.
+FTS_TABLE = "materials_material_fts"
+VIEW_NAME = "materials_material_search"
+COLUMNS = "owner, title, body, summary, key_terms"
+# bm25 column weights: owner, title, body, summary, key_terms
+BM25_WEIGHTS = (0.0, 10.0, 1.0, 3.0, 5.0)
+SNIPPET_TOKENS = 16
+# Snippets come from the body column (the owner column would always "match")
+SNIPPET_COLUMN = 2
+MAX_QUERY_TERMS = 16
+# snippet() marks matches with these; the text is escaped before they become <mark> tags
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):  # legacy uncompressed row
+        return value
+    return decompress(value).decode("utf-8")
+
+
+def _summary(value):
+    if value is None:
+        return ""
+    data = json.loads(_text(value))
+    if isinstance(data, dict):
+        return str(data.get("summary") or "")
+    return str(data or "")
+
+
+def _terms(value):
+    if not value:
+        return ""
+    terms = json.loads(value)
+    if not isinstance(terms, list):
+        terms = [terms]
+    return " ".join(str(term) for term in terms)
+
+
+# The view decompresses through these, so they must be registered on every
+# connection (see signals.register_search_functions)
+FUNCTIONS = {"materials_text": _text, "materials_summary": _summary, "materials_terms": _terms}
+
+
+def register_functions(dbapi_connection):
+    for name, func in FUNCTIONS.items():
+        dbapi_connection.create_function(name, 1, func, deterministic=True)
+
+
+def is_available(conn=None):
+    return (conn or connection).vendor == "sqlite"
+
+
+def _owner_token(user_id):
+    return f"u{user_id}"
+
+
+def _is_indexed(cursor, material_id):
+    # The table itself would answer from the content view; the docsize shadow table only has indexed rows
+    cursor.execute(f"SELECT 1 FROM {FTS_TABLE}_docsize WHERE id = %s", [material_id])
+    return cursor.fetchone() is not None
+
+
+def index_material(material_id):
+    """Indexes a material's current content. Call after the content is written."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        if _is_indexed(cursor, material_id):
+            return
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {COLUMNS}) SELECT id, {COLUMNS} FROM {VIEW_NAME} WHERE id = %s",
+            [material_id],
+        )
+
+
+def remove_material(material_id):
+    """
+    Drops a material from the index. Call before its content changes: FTS5
+    removes the tokens it is given, which must be the ones it indexed.
+    """
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        if not _is_indexed(cursor, material_id):
+            return
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {COLUMNS}) "
+            f"SELECT 'delete', id, {COLUMNS} FROM {VIEW_NAME} WHERE id = %s",
+            [material_id],
+        )
+
+
+def build_match(query):
+    """
+    Turns free text into a safe FTS5 query: every word must match (the last
+    one as a prefix, for search-as-you-type). Returns None if there are no words.
+    """
+    terms = _TERM.findall(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _highlight(snippet):
+    """Escapes snippet text, then turns the match markers into <mark> tags."""
+    return html.escape(snippet or "").replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+def search(user, query, offset=0, limit=20):
+    """
+    Ranked full-text search over one user's materials.
+    Returns (total, rows) with rows as {"id", "title", "snippet", "rank"}, best
+    match first. snippet is HTML: escaped text with matches in <mark>.
+    """
+    match = build_match(query)
+    if match is None:
+        return 0, []
+    # Restricting on the owner column inside MATCH keeps the filter in the index
+    match = f"owner:{_owner_token(user.id)} AND ({match})"
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        total = cursor.fetchone()[0]
+        if not total:
+            return 0, []
+
+        # Rank from the index alone; reading title or snippet() goes through the
+        # content view, which decompresses the row, so only the page pays for it
+        weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+        cursor.execute(
+            f"""
+            SELECT rowid, bm25({FTS_TABLE}, {weights}) AS score
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY score
+            LIMIT %s OFFSET %s
+            """,
+            [match, limit, offset],
+        )
+        page = cursor.fetchall()
+        if not page:
+            return total, []
+
+        ids = [rowid for rowid, _ in page]
+        cursor.execute(
+            f"""
+            SELECT rowid, title,
+                   snippet({FTS_TABLE}, {SNIPPET_COLUMN}, %s, %s, '…', {SNIPPET_TOKENS})
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s AND rowid IN ({", ".join(["%s"] * len(ids))})
+            """,
+            [_MARK_START, _MARK_END, match, *ids],
+        )
+        shown = {rowid: (title, snippet) for rowid, title, snippet in cursor.fetchall()}
+
+    rows = []
+    for rowid, score in page:
+        title, snippet = shown.get(rowid, ("", ""))
+        # bm25 is lower-is-better; flip it so clients can sort descending
+        rows.append({"id": rowid, "title": title, "snippet": _highlight(snippet), "rank": round(-score, 4)})
+    return total, rows
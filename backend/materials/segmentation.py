@@ -1,24 +1,31 @@
 # segmentation.py
 
 import os
+import re
 import json
-import requests
 from dotenv import load_dotenv
 
+from . import llm_cache
+from .chunking import chunk_words
+from .compaction import compact_text
+from .local_segmentation import segment_text_local
+from .llm_client import chat_completion, stream_chat_completion, map_concurrently, get_executor
+from .streaming import JSONArrayStreamParser
+
 # Load environment variables from .env
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_BASE = os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1")
 MODEL = os.getenv("MODEL", "llama-3.1-8b-instant")
 
+# How many extra attempts a chunk gets when the model returns unusable JSON
+SEGMENT_CHUNK_RETRIES = int(os.getenv("SEGMENT_CHUNK_RETRIES", "2"))
 
-def segment_text(cleaned_text):
-    """
-    Sends cleaned text to Groq LLaMA 3 and returns educational segments.
-    """
+# "llm" or "local" (instant chunking + TF-IDF key terms, no explanations)
+SEGMENT_ENGINE = os.getenv("SEGMENT_ENGINE", "llm")
+ENGINES = ("llm", "local")
 
-    system_prompt = """
+SYSTEM_PROMPT = """
 You are an educational reading tutor. Break the given text into small learning segments for high school students.
 
 Each segment should include:
@@ -38,36 +45,153 @@ Return ONLY a JSON array, like:
 ]
 """
 
-    payload = {
+ENRICH_PROMPT = """
+You are an educational reading tutor. The given text is one learning segment for high school students.
+
+Write:
+- a simple explanation (2–3 sentences)
+- one example OR one practice question
+
+Return ONLY a JSON object, like:
+{
+  "explanation": "...",
+  "example": "..."
+}
+"""
+
+
+def _build_payload(text, system_prompt=SYSTEM_PROMPT, max_tokens=2000):
+    return {
         "model": MODEL,
         "temperature": 0.2,
         "messages": [
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": cleaned_text},
+            {"role": "user", "content": text},
         ],
-        "max_tokens": 2000,
+        "max_tokens": max_tokens,
     }
 
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json",
-    }
 
-    response = requests.post(
-        f"{GROQ_API_BASE}/chat/completions",
-        headers=headers,
-        json=payload,
-    )
+def parse_segments(content):
+    """
+    Parses the model output into a list of segment dicts.
+    Returns None if it is not a usable JSON array.
+    """
+    content = re.sub(r"^```(?:json)?|```$", "", content.strip(), flags=re.MULTILINE).strip()
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+
+    if isinstance(data, dict) and "segment" in data:
+        data = [data]
+    if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+        return None
+    return data
+
+
+def _segment_chunk(chunk):
+    """
+    Segments one chunk, retrying only this chunk when the JSON is unusable.
+    Falls back to the bare chunk so one bad completion never loses text.
+    """
+    payload = _build_payload(chunk)
+    content = ""
+    for attempt in range(SEGMENT_CHUNK_RETRIES + 1):
+        # Raises GroqAPIError if Groq keeps failing after retries
+        content = chat_completion(payload, GROQ_API_KEY, cache=(attempt == 0))
+        segments = parse_segments(content)
+        if segments:
+            if attempt > 0:
+                llm_cache.store(llm_cache.cache_key(payload), content, model=MODEL)
+            return segments
+        # Don't keep serving a completion we can't use
+        llm_cache.invalidate(llm_cache.cache_key(payload))
+
+    print("❌ Groq returned invalid JSON for a chunk:", content[:200])
+    return [{"segment": chunk, "explanation": "", "key_terms": [], "example": ""}]
+
+
+def segment_text(cleaned_text, engine=None):
+    """
+    Sends cleaned text to Groq LLaMA 3 and returns educational segments.
+    The text is pre-split into ~80–250 word chunks that are segmented
+    concurrently and merged back in document order.
+    engine="local" skips the LLM entirely (see local_segmentation.py).
+    Repeated headers/footers and duplicate paragraphs are compacted away first.
+    """
+    engine = engine or SEGMENT_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown segmentation engine: {engine}")
+    cleaned_text, _ = compact_text(cleaned_text)
+    if engine == "local":
+        return segment_text_local(cleaned_text)
 
-    # If error from API
-    if response.status_code != 200:
-        raise Exception(f"Groq API error: {response.text}")
+    chunks = chunk_words(cleaned_text) or [cleaned_text]
+    results = map_concurrently(_segment_chunk, chunks)
+    return [segment for chunk_segments in results for segment in chunk_segments]
 
-    data = response.json()
-    content = data["choices"][0]["message"]["content"]
 
-    # Try to parse JSON
+def _enrich_segment(segment):
+    if segment.get("explanation") and segment.get("example"):
+        return segment
+
+    payload = _build_payload(segment.get("segment", ""), ENRICH_PROMPT, max_tokens=400)
+    content = chat_completion(payload, GROQ_API_KEY)
+    content = re.sub(r"^```(?:json)?|```$", "", content.strip(), flags=re.MULTILINE).strip()
     try:
-        return json.loads(content)
+        extra = json.loads(content)
     except json.JSONDecodeError:
-        return {"error": "Could not parse JSON", "raw": content}
+        llm_cache.invalidate(llm_cache.cache_key(payload))
+        return segment
+    if not isinstance(extra, dict):
+        return segment
+
+    return {
+        **segment,
+        "explanation": segment.get("explanation") or str(extra.get("explanation", "")),
+        "example": segment.get("example") or str(extra.get("example", "")),
+    }
+
+
+def enrich_segments(segments):
+    """
+    Fills in explanation/example for locally produced segments, one LLM
+    call per segment on the shared pool. Segment text and key terms are kept.
+    """
+    return map_concurrently(_enrich_segment, segments)
+
+
+def stream_segment_text(cleaned_text):
+    """
+    Yields segments one at a time, in document order.
+    The first chunk is streamed and each segment is emitted as soon as its
+    JSON object is complete; the remaining chunks are segmented concurrently
+    in the meantime and emitted in order once the first one is done.
+    """
+    cleaned_text, _ = compact_text(cleaned_text)
+    chunks = chunk_words(cleaned_text) or [cleaned_text]
+    executor = get_executor()
+    pending = [executor.submit(_segment_chunk, chunk) for chunk in chunks[1:]]
+
+    try:
+        parser = JSONArrayStreamParser()
+        emitted = 0
+        content = []
+        payload = _build_payload(chunks[0])
+        for delta in stream_chat_completion(payload, GROQ_API_KEY):
+            content.append(delta)
+            for segment in parser.feed(delta):
+                emitted += 1
+                yield segment
+
+        if not emitted:
+            # Streamed output was unusable: fall back to the retrying path
+            llm_cache.invalidate(llm_cache.cache_key(payload))
+            yield from _segment_chunk(chunks[0])
+
+        for future in pending:
+            yield from future.result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -1,15 +1,78 @@
 from rest_framework import serializers
 from .models import Material
-from .models import Vocabulary
+from .models import Vocabulary, Job, Segment
 
 MAX_CHARS = 20000  # adjust if needed
 
-class MaterialSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Lets a serializer emit only some of its fields (fields=[names]), and
+    tells views which model columns those fields read, so the rest can be
+    left out of the query with only().
+    """
+    # Fields whose source isn't a column of the same name: {field name: (columns,)}
+    field_columns = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def select(cls, fields=None, exclude=None):
+        """
+        Field names to emit for comma-separated ?fields= / ?exclude= values,
+        in declaration order. Raises ValueError for unknown names.
+        """
+        available = list(cls().fields)
+        wanted = [name.strip() for name in (fields or "").split(",") if name.strip()]
+        unwanted = {name.strip() for name in (exclude or "").split(",") if name.strip()}
+        unknown = sorted((set(wanted) | unwanted) - set(available))
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        return [name for name in available if (not wanted or name in wanted) and name not in unwanted]
+
+    @classmethod
+    def columns(cls, names):
+        """Model columns needed to render the given fields (the pk is always loaded)."""
+        fields = cls().fields
+        concrete = {field.name for field in cls.Meta.model._meta.concrete_fields}
+        columns = set()
+        for name in names:
+            source = fields[name].source
+            columns.update(cls.field_columns.get(name, [source] if source in concrete else []))
+        return columns
+
+
+class MaterialSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Declared explicitly since the model stores these compressed
+    raw_text = serializers.CharField()
+    summary_data = serializers.JSONField(required=False, allow_null=True)
+    quiz_data = serializers.JSONField(required=False, allow_null=True)
+    # Same list-of-dicts shape as before; stored as Segment rows
+    segmented_data = serializers.JSONField(source="segment_payload", required=False, allow_null=True)
+
+    field_columns = {"segmented_data": ("segmented_data",)}
+
     class Meta:
         model = Material
-        fields = ["id", "title", "raw_text", "segmented_data", "summary_data", "created_at"]
+        fields = ["id", "title", "raw_text", "segmented_data", "summary_data", "quiz_data", "created_at"]
         read_only_fields = ["id", "created_at"]
 
+    def update(self, instance, validated_data):
+        has_segments = "segment_payload" in validated_data
+        segments = validated_data.pop("segment_payload", None)
+        instance = super().update(instance, validated_data)
+        if has_segments:
+            if isinstance(segments, list):
+                instance.set_segments(segments)
+            else:
+                instance.set_segments([])
+                instance.segmented_data = segments
+                instance.save(update_fields=["segmented_data"])
+        return instance
+
     def validate_cleaned_text(self, value):
         if value and len(value) > MAX_CHARS:
             raise serializers.ValidationError(
@@ -17,8 +80,33 @@ class MaterialSerializer(serializers.ModelSerializer):
             )
         return value
 
-class VocabularySerializer(serializers.ModelSerializer):
+class MaterialListSerializer(serializers.ModelSerializer):
+    """Library listing: no text or generated content, just what the list shows."""
+    has_segments = serializers.BooleanField(read_only=True)
+    has_summary = serializers.BooleanField(read_only=True)
+    has_quiz = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Material
+        fields = ["id", "title", "created_at", "word_count", "has_segments", "has_summary", "has_quiz"]
+        read_only_fields = fields
+
+class SegmentSerializer(serializers.ModelSerializer):
+    key_terms = serializers.ListField(child=serializers.CharField(), required=False)
+
+    class Meta:
+        model = Segment
+        fields = ["position", "segment", "explanation", "key_terms", "example"]
+        read_only_fields = ["position"]
+
+class VocabularySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Vocabulary
         fields = ["id", "word", "meaning", "example", "created_at"]
-        read_only_fields = ["id", "created_at"]
\ No newline at end of file
+        read_only_fields = ["id", "created_at"]
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ["id", "kind", "status", "material", "progress", "error", "created_at", "started_at", "finished_at"]
+        read_only_fields = fields
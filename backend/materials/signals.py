@@ -0,0 +1,71 @@
+# signals.py
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import search
+from .models import Material, Segment, segments_changed, segments_changing
+
+# Saves that touch none of these leave the search index as it is
+INDEXED_FIELDS = {"title", "raw_text", "summary_data"}
+
+
+def _touches_index(update_fields, fields):
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+@receiver(connection_created)
+def register_search_functions(sender, connection, **kwargs):
+    if search.is_available(connection):
+        search.register_functions(connection.connection)
+
+
+# The index forgets a row using its indexed content, so removal runs before each
+# write and indexing after it. Material.save, Segment.save and set_segments keep
+# all three in one write-locked transaction (see transaction_mode in settings).
+
+@receiver(pre_save, sender=Material)
+def unindex_changed_material(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is not None and _touches_index(update_fields, INDEXED_FIELDS):
+        search.remove_material(instance.pk)
+
+
+@receiver(post_save, sender=Material)
+def index_material(sender, instance, update_fields=None, **kwargs):
+    if _touches_index(update_fields, INDEXED_FIELDS):
+        search.index_material(instance.id)
+
+
+@receiver(pre_delete, sender=Material)
+def unindex_material(sender, instance, **kwargs):
+    search.remove_material(instance.id)
+
+
+@receiver(segments_changing, sender=Material)
+def unindex_segments(sender, instance, **kwargs):
+    search.remove_material(instance.id)
+
+
+@receiver(segments_changed, sender=Material)
+def index_segments(sender, instance, **kwargs):
+    search.index_material(instance.id)
+
+
+@receiver(pre_save, sender=Segment)
+def unindex_segment(sender, instance, update_fields=None, **kwargs):
+    if _touches_index(update_fields, {"key_terms"}):
+        search.remove_material(instance.material_id)
+
+
+@receiver(post_save, sender=Segment)
+def index_segment(sender, instance, update_fields=None, **kwargs):
+    if _touches_index(update_fields, {"key_terms"}):
+        search.index_material(instance.material_id)
+
+
+@receiver(post_save, sender=Segment)
+def touch_material(sender, instance, **kwargs):
+    # A single-segment edit changes the material's representation too
+    Material.objects.filter(id=instance.material_id).update(updated_at=timezone.now())
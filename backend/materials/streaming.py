@@ -0,0 +1,82 @@
+# streaming.py
+
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class JSONArrayStreamParser:
+    """
+    Incremental parser for a JSON array of objects arriving in arbitrary pieces.
+    feed() returns every top-level object completed by the new text, so
+    segments can be emitted while the model is still writing the rest.
+    Anything before the opening "[" (a prose preamble) is ignored.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text):
+        completed = []
+        for char in text:
+            if not self._started:
+                self._started = char == "["
+                continue
+            if self._depth > 0:
+                self._buffer.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = self._depth > 0
+            elif char == "{":
+                if self._depth == 0:
+                    self._buffer = ["{"]
+                self._depth += 1
+            elif char == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    obj = self._decode("".join(self._buffer))
+                    if obj is not None:
+                        completed.append(obj)
+                    self._buffer = []
+        return completed
+
+    @staticmethod
+    def _decode(raw):
+        try:
+            obj = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        return obj if isinstance(obj, dict) else None
+
+
+def sse_event(event, data):
+    """Formats one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets streaming views pass DRF content negotiation for
+    Accept: text/event-stream; plain errors are sent as an "error" event.
+    """
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, str)):
+            return data
+        return sse_event("error", data)
@@ -1,22 +1,39 @@
 import os
-import json
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
 
+from .chunking import chunk_text, estimate_tokens
+from .compaction import compact_text
+from .extractive import extractive_summary
+from .llm_client import GroqAPIError, chat_completion, stream_chat_completion, map_concurrently
+
 # Load environment variables
 load_dotenv()
 
 GROQ_SUMMARIZATION_KEY = os.getenv("GROQ_SUMMARIZATION_KEY")
-GROQ_API_BASE = os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1")
 MODEL = os.getenv("SUMMARIZATION_MODEL", "llama-3.1-8b-instant")  # optional: separate model
 
+# Inputs above this many (estimated) tokens use map-reduce summarization
+LONG_DOCUMENT_TOKENS = int(os.getenv("SUMMARY_LONG_DOCUMENT_TOKENS", "4000"))
+# Token budget for each chunk in the map step
+CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
 
-def summarize_text(cleaned_text):
-    """
-    Sends cleaned text to Groq LLaMA 3 to generate a concise summary.
-    Returns a dict that can be saved in Material.summary_data.
-    """
-    system_prompt = """
+# "llm", "extractive" or "auto" (LLM, falling back to extractive when it fails or is slow)
+SUMMARY_ENGINE = os.getenv("SUMMARY_ENGINE", "auto")
+ENGINES = ("llm", "extractive", "auto")
+# Seconds "auto" gives the LLM, counted from its first request, before answering extractively
+SUMMARY_LLM_DEADLINE = float(os.getenv("SUMMARY_LLM_DEADLINE", "30"))
+# Upper bound on the whole wait, including time queued behind other LLM work
+SUMMARY_LLM_MAX_WAIT = float(os.getenv("SUMMARY_LLM_MAX_WAIT", "120"))
+EXTRACTIVE_METHOD = os.getenv("SUMMARY_EXTRACTIVE_METHOD", "textrank")
+
+_deadline_executor = None
+_deadline_pid = None
+_deadline_lock = threading.Lock()
+
+SYSTEM_PROMPT = """
 You are an educational reading tutor. Summarize the text for high school students.
 - Keep it concise and clear
 - Highlight main points
@@ -24,32 +41,230 @@ You are an educational reading tutor. Summarize the text for high school student
 Return ONLY a plain text summary.
 """
 
-    payload = {
+CHUNK_PROMPT = """
+You are an educational reading tutor. The text is one part of a longer document.
+Summarize this part for high school students.
+- Keep every main point and key term from this part
+- Avoid adding extra information
+Return ONLY a plain text summary.
+"""
+
+REDUCE_PROMPT = """
+You are an educational reading tutor. The text is a list of summaries of consecutive
+parts of one document. Combine them into a single summary for high school students.
+- Keep it concise and clear
+- Highlight main points in document order
+- Avoid adding extra information
+Return ONLY a plain text summary.
+"""
+
+
+class SummaryAbandoned(Exception):
+    """Raised by queued LLM calls of a summary that already fell back to extractive."""
+
+
+class _Deadline:
+    """
+    Tracks an "auto" summary's LLM work: the clock starts when the first
+    request actually goes out (not while it waits for a pool slot), and
+    abandon() makes any call that hasn't started yet skip itself.
+    """
+
+    def __init__(self):
+        self.started_at = None
+        self.abandoned = threading.Event()
+        self._lock = threading.Lock()
+
+    def begin_call(self):
+        if self.abandoned.is_set():
+            raise SummaryAbandoned()
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+
+    def remaining(self, seconds):
+        """Seconds left, or None while no request has started."""
+        with self._lock:
+            if self.started_at is None:
+                return None
+            return self.started_at + seconds - time.monotonic()
+
+    def abandon(self):
+        self.abandoned.set()
+
+
+def _build_payload(text, system_prompt, max_tokens=1000):
+    return {
         "model": MODEL,
         "temperature": 0.2,
         "messages": [
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": cleaned_text},
+            {"role": "user", "content": text},
         ],
-        "max_tokens": 1000,
+        "max_tokens": max_tokens,
     }
 
-    headers = {
-        "Authorization": f"Bearer {GROQ_SUMMARIZATION_KEY}",
-        "Content-Type": "application/json",
-    }
 
-    response = requests.post(
-        f"{GROQ_API_BASE}/chat/completions",
-        headers=headers,
-        json=payload,
+def _summarize(text, system_prompt, max_tokens=1000, deadline=None):
+    # Raises GroqAPIError if Groq keeps failing after retries
+    if deadline is not None:
+        deadline.begin_call()
+    return chat_completion(_build_payload(text, system_prompt, max_tokens), GROQ_SUMMARIZATION_KEY).strip()
+
+
+def _map_chunks(cleaned_text, deadline=None):
+    """
+    Map step of map-reduce summarization: chunks are summarized concurrently
+    on the shared LLM pool. If the combined chunk summaries are still too
+    long, they are reduced again the same way. Returns the text for the
+    final reduce pass.
+    """
+    chunks = chunk_text(cleaned_text, CHUNK_TOKENS)
+    partials = map_concurrently(
+        lambda chunk: _summarize(chunk, CHUNK_PROMPT, max_tokens=600, deadline=deadline), chunks
     )
 
-    if response.status_code != 200:
-        raise Exception(f"Groq API error: {response.text}")
+    combined = "\n\n".join(partials)
+    while estimate_tokens(combined) > LONG_DOCUMENT_TOKENS:
+        groups = chunk_text(combined, CHUNK_TOKENS)
+        if len(groups) <= 1:
+            break
+        combined = "\n\n".join(
+            map_concurrently(
+                lambda group: _summarize(group, REDUCE_PROMPT, max_tokens=600, deadline=deadline), groups
+            )
+        )
+    return combined
+
+
+def summarize_long_text(cleaned_text, deadline=None):
+    """Map-reduce summarization for inputs that don't fit one prompt."""
+    return _summarize(_map_chunks(cleaned_text, deadline), REDUCE_PROMPT, deadline=deadline)
+
+
+def _is_long(cleaned_text, long_document):
+    if long_document is None:
+        return estimate_tokens(cleaned_text) > LONG_DOCUMENT_TOKENS
+    return bool(long_document)
+
+
+def _llm_summary(cleaned_text, long_document, deadline=None):
+    if _is_long(cleaned_text, long_document):
+        return summarize_long_text(cleaned_text, deadline)
+    return _summarize(cleaned_text, SYSTEM_PROMPT, deadline=deadline)
+
+
+def _wait_for_llm(future, deadline):
+    """
+    Waits for an "auto" summary's LLM result. Returns the summary, or None
+    when the LLM ran out of time; GroqAPIError propagates.
+    """
+    waited_since = time.monotonic()
+    while True:
+        queue_left = waited_since + SUMMARY_LLM_MAX_WAIT - time.monotonic()
+        remaining = deadline.remaining(SUMMARY_LLM_DEADLINE)
+        if remaining is None:
+            # Nothing sent yet (queued behind other LLM work): look again shortly
+            timeout = min(0.5, queue_left)
+        else:
+            timeout = min(remaining, queue_left)
+        try:
+            return future.result(timeout=max(timeout, 0))
+        except FutureTimeoutError:
+            if time.monotonic() - waited_since >= SUMMARY_LLM_MAX_WAIT:
+                return None
+            remaining = deadline.remaining(SUMMARY_LLM_DEADLINE)
+            if remaining is not None and remaining <= 0:
+                return None
+
+
+def _get_deadline_executor():
+    """Separate from the LLM pool, since the map step fans out onto that pool."""
+    global _deadline_executor, _deadline_pid
+
+    pid = os.getpid()
+    with _deadline_lock:
+        if _deadline_executor is None or _deadline_pid != pid:
+            _deadline_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="summary")
+            _deadline_pid = pid
+    return _deadline_executor
+
 
-    data = response.json()
-    content = data["choices"][0]["message"]["content"]
+def _resolve_engine(engine):
+    engine = engine or SUMMARY_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown summarization engine: {engine}")
+    return engine
+
+
+def summarize_text(cleaned_text, long_document=None, engine=None):
+    """
+    Sends cleaned text to Groq LLaMA 3 to generate a concise summary.
+    Long inputs (or long_document=True) go through map-reduce summarization.
+
+    engine="extractive" answers locally from the top-ranked sentences;
+    engine="auto" uses the LLM but falls back to that when Groq errors or
+    takes longer than SUMMARY_LLM_DEADLINE once its first request is out
+    (time spent queued for the shared LLM pool doesn't count, up to
+    SUMMARY_LLM_MAX_WAIT). On fallback, LLM calls that haven't started are
+    skipped; one already in flight still lands in the cache for next time.
+    The input is compacted first (see compaction.py); the returned dict
+    carries the tokens that saved under "compaction".
+    Returns a dict that can be saved in Material.summary_data.
+    """
+    engine = _resolve_engine(engine)
+    cleaned_text, compaction = compact_text(cleaned_text)
+
+    if engine == "llm":
+        content = _llm_summary(cleaned_text, long_document)
+    elif engine == "extractive":
+        content = extractive_summary(cleaned_text, method=EXTRACTIVE_METHOD)
+    else:
+        deadline = _Deadline()
+        future = _get_deadline_executor().submit(_llm_summary, cleaned_text, long_document, deadline)
+        try:
+            content = _wait_for_llm(future, deadline)
+            if content is None:
+                print(f"⚠️ Falling back to extractive summary: LLM didn't answer within {SUMMARY_LLM_DEADLINE:g}s")
+        except GroqAPIError as e:
+            print("⚠️ Falling back to extractive summary:", e)
+            content = None
+
+        if content is None:
+            deadline.abandon()
+            content = extractive_summary(cleaned_text, method=EXTRACTIVE_METHOD)
+            engine = "extractive"
+        else:
+            engine = "llm"
 
     # Wrap summary in a dict for JSONField storage
-    return {"summary": content.strip()}
+    return {"summary": content, "engine": engine, "compaction": compaction}
+
+
+def stream_summarize_text(cleaned_text, long_document=None, engine=None):
+    """
+    Yields the summary text piece by piece as Groq produces it.
+    For long inputs the map step runs first and only the reduce pass is streamed.
+    The extractive engine yields its whole summary at once.
+    """
+    engine = _resolve_engine(engine)
+    cleaned_text, _ = compact_text(cleaned_text)
+    if engine == "extractive":
+        yield extractive_summary(cleaned_text, method=EXTRACTIVE_METHOD)
+        return
+
+    try:
+        if _is_long(cleaned_text, long_document):
+            payload = _build_payload(_map_chunks(cleaned_text), REDUCE_PROMPT)
+        else:
+            payload = _build_payload(cleaned_text, SYSTEM_PROMPT)
+        stream = stream_chat_completion(payload, GROQ_SUMMARIZATION_KEY)
+        first = next(stream, "")
+    except GroqAPIError:
+        if engine == "llm":
+            raise
+        yield extractive_summary(cleaned_text, method=EXTRACTIVE_METHOD)
+        return
+
+    yield first
+    yield from stream
@@ -1,3 +1,329 @@
-from django.test import TestCase
+import hashlib
+import json
+import threading
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from . import dictionary, fields, llm_client, search, upload_cache
+from .compaction import compact_text, join_pages
+from .extraction import clean_text
+from .models import Material, UploadCacheEntry
+from .streaming import JSONArrayStreamParser
+
+
+class CompactTextTests(SimpleTestCase):
+    def test_repeated_body_text_is_not_erased(self):
+        text = "\n".join(
+            f"{i}. Measure the length of the rectangle and write down the answer in centimetres."
+            for i in range(1, 13)
+        )
+        compacted, report = compact_text(text)
+        self.assertEqual(compacted, text)
+        self.assertEqual(report["tokens_saved"], 0)
+
+    def test_rows_that_differ_by_numbers_are_kept(self):
+        rows = [f"Sample {i}: the solution was heated to {40 + i} degrees for {i * 5} minutes" for i in range(1, 9)]
+        text = "\n".join(rows)
+        compacted, report = compact_text(text)
+        self.assertEqual(compacted, text)
+        self.assertEqual(report["lines_removed"], 0)
+
+    def test_running_header_keeps_first_copy(self):
+        bodies = [
+            "Water evaporates from oceans and lakes when the sun heats their surface during the day.",
+            "The vapour rises, cools and condenses into tiny droplets that gather to form clouds.",
+            "When the droplets grow heavy enough they fall back to the ground as rain or snow.",
+            "Rivers and underground streams carry that water back to the sea, closing the cycle.",
+        ]
+        pages = [f"Chapter One: The Water Cycle Explained\n{body}" for body in bodies]
+        cleaned = clean_text(pages, pages=True)
+        compacted, report = compact_text(cleaned)
+        self.assertEqual(compacted.count("Chapter One: The Water Cycle Explained"), 1)
+        self.assertEqual(report["lines_removed"], 3)
+        for body in bodies:
+            self.assertIn(body, compacted)
+
+    def test_short_pages_lose_header_and_footer(self):
+        pages = [
+            "Grade Five Science Workbook, Unit Two\n"
+            f"Exercise {page}: name the parts of the flower shown in picture {page}.\n"
+            f"Describe what the {part} does for the plant in one full sentence.\n"
+            f"Colour the {part} green and label it clearly on the diagram.\n"
+            f"Worksheet page {page} of 6, keep it in your folder"
+            for page, part in enumerate(["petal", "stem", "root", "leaf", "seed", "pollen"], start=1)
+        ]
+        compacted, report = compact_text(clean_text(pages, pages=True))
+        self.assertFalse(report["skipped"])
+        self.assertGreater(report["tokens_saved"], 0)
+        self.assertEqual(compacted.count("Grade Five Science Workbook"), 1)
+        self.assertEqual(compacted.count("keep it in your folder"), 1)
+        self.assertIn("Exercise 6: name the parts of the flower shown in picture 6.", compacted)
+
+    def test_join_pages_leaves_no_page_breaks(self):
+        pages = [
+            "Chapter One: The Water Cycle Explained\n"
+            f"Experiment {i}: leave a bowl of water in the sun and measure it after {i + 1} hours.\n"
+            "Write down how much of the water is left and explain where the rest went."
+            for i in range(4)
+        ]
+        joined = join_pages(clean_text(pages, pages=True))
+        self.assertNotIn("\f", joined)
+        self.assertEqual(joined.count("Chapter One: The Water Cycle Explained"), 1)
+        self.assertIn("Experiment 3: leave a bowl of water in the sun and measure it after 4 hours.", joined)
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="reader", email="reader@example.com", password="pw")
+
+    def assertIndexIntact(self):
+        with connection.cursor() as cursor:
+            # rank=1 checks the index against the content it was built from
+            cursor.execute(
+                f"INSERT INTO {search.FTS_TABLE} ({search.FTS_TABLE}, rank) VALUES ('integrity-check', 1)"
+            )
+
+    def test_index_follows_edits_without_storing_text(self):
+        material = Material.objects.create(user=self.user, title="Cells", raw_text="Chlorophyll absorbs light.")
+        material.set_segments([{"segment": "Leaves", "key_terms": ["stomata"]}])
+        self.assertEqual(search.search(self.user, "chloro")[0], 1)
+        self.assertEqual(search.search(self.user, "stomata")[0], 1)
+
+        material.raw_text = "Mitochondria produce energy."
+        material.save()
+        material.set_segments([{"segment": "Cells", "key_terms": ["ribosome"]}])
+        self.assertIndexIntact()
+        self.assertEqual(search.search(self.user, "chloro")[0], 0)
+        self.assertEqual(search.search(self.user, "stomata")[0], 0)
+        total, rows = search.search(self.user, "mitochondria ribosome")
+        self.assertEqual(total, 1)
+        self.assertIn("<mark>Mitochondria</mark>", rows[0]["snippet"])
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name = %s", [f"{search.FTS_TABLE}_content"])
+            self.assertIsNone(cursor.fetchone())
+
+        material.delete()
+        self.assertIndexIntact()
+        self.assertEqual(search.search(self.user, "mitochondria")[0], 0)
+
+    def test_snippet_escapes_document_text(self):
+        Material.objects.create(user=self.user, title="Notes", raw_text='<img src=x onerror="alert(1)"> Energy & work')
+        total, rows = search.search(self.user, "energy")
+        self.assertEqual(total, 1)
+        self.assertNotIn("<img", rows[0]["snippet"])
+        self.assertIn("&lt;img", rows[0]["snippet"])
+        self.assertIn("<mark>Energy</mark> &amp; work", rows[0]["snippet"])
+
+
+class SingleflightTests(SimpleTestCase):
+    def test_follower_gives_up_on_a_slow_leader(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_load(key):
+            started.set()
+            release.wait(5)
+            return {"word": key}
+
+        leader = threading.Thread(target=dictionary._singleflight, args=("ossify", slow_load))
+        leader.start()
+        try:
+            self.assertTrue(started.wait(5))
+            with mock.patch.object(dictionary, "DICTIONARY_TIMEOUT", 0.05):
+                with self.assertRaises(dictionary.DictionaryUnavailable):
+                    dictionary._singleflight("ossify", slow_load)
+        finally:
+            release.set()
+            leader.join(5)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="reader", email="reader@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_delete_invalidates_the_list(self):
+        older = Material.objects.create(user=self.user, title="Older", raw_text="First text.")
+        Material.objects.create(user=self.user, title="Newer", raw_text="Second text.")
+        url = reverse("materials_list")
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Last-Modified", response)
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # The newest updated_at stays the same, so only the ETag can notice this
+        self.assertEqual(self.client.delete(reverse("material_detail", args=[older.id])).status_code, 204)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class CompressionTests(TestCase):
+    def test_admin_html_is_not_compressed(self):
+        response = self.client.get("/admin/login/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Content-Encoding", response)
+        self.assertIn(b"csrfmiddlewaretoken", response.content)
+
+    def test_large_json_is_compressed(self):
+        user = get_user_model().objects.create_user(username="reader", email="reader@example.com", password="pw")
+        Material.objects.create(user=user, title="Long", raw_text="Plenty of repeated words. " * 200)
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(reverse("materials_list"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+
+class CompressedFieldTests(SimpleTestCase):
+    text_field = fields.CompressedTextField()
+    json_field = fields.CompressedJSONField()
+
+    def round_trip(self, field, value):
+        stored = field.get_prep_value(value)
+        return stored, field.to_python(field.from_db_value(stored, None, None))
+
+    def test_small_values_are_stored_raw(self):
+        for value in ("", "short text"):
+            stored, loaded = self.round_trip(self.text_field, value)
+            self.assertEqual(stored[:1], fields.RAW)
+            self.assertEqual(loaded, value)
+
+    def test_large_values_use_zlib(self):
+        text = "Plants turn light into sugar. " * 200
+        stored, loaded = self.round_trip(self.text_field, text)
+        self.assertEqual(stored[:1], fields.ZLIB)
+        self.assertLess(len(stored), len(text))
+        self.assertEqual(loaded, text)
+
+    def test_zstd_falls_back_to_zlib_without_the_package(self):
+        text = "Plants turn light into sugar. " * 200
+        with mock.patch.object(fields, "COMPRESSION_CODEC", "zstd"), mock.patch.object(fields, "zstandard", None):
+            stored, loaded = self.round_trip(self.text_field, text)
+        self.assertEqual(stored[:1], fields.ZLIB)
+        self.assertEqual(loaded, text)
+
+    @skipUnless(fields.zstandard, "zstandard is not installed")
+    def test_large_values_use_zstd(self):
+        text = "Plants turn light into sugar. " * 200
+        with mock.patch.object(fields, "COMPRESSION_CODEC", "zstd"):
+            stored, loaded = self.round_trip(self.text_field, text)
+        self.assertEqual(stored[:1], fields.ZSTD)
+        self.assertEqual(loaded, text)
+
+    def test_json_round_trip(self):
+        for value in ({}, [], {"summary": "Café ☕ " * 300, "engine": "llm"}):
+            _, loaded = self.round_trip(self.json_field, value)
+            self.assertEqual(loaded, value)
+
+    def test_none_is_stored_as_null(self):
+        self.assertIsNone(self.text_field.get_prep_value(None))
+        self.assertIsNone(self.text_field.from_db_value(None, None, None))
+
+    def test_legacy_text_rows_are_read_as_they_are(self):
+        self.assertEqual(self.text_field.from_db_value("plain old text", None, None), "plain old text")
+        self.assertEqual(self.json_field.from_db_value('{"summary": "old"}', None, None), {"summary": "old"})
+
+    def test_unknown_header_is_rejected(self):
+        with self.assertRaises(ValueError):
+            fields.decompress(b"\x09payload")
+
+
+class CompressedFieldDatabaseTests(TestCase):
+    def test_material_round_trip_and_legacy_row(self):
+        user = get_user_model().objects.create_user(username="reader", email="reader@example.com", password="pw")
+        text = "Rivers carry water back to the sea. " * 100
+        material = Material.objects.create(user=user, title="Water", raw_text=text, summary_data={"summary": "Cycle"})
+        material = Material.objects.get(id=material.id)
+        self.assertEqual(material.raw_text, text)
+        self.assertEqual(material.summary_data, {"summary": "Cycle"})
+
+        # Rows written before compression hold plain text
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE materials_material SET raw_text = %s, summary_data = %s WHERE id = %s",
+                ["legacy text", '{"summary": "legacy"}', material.id],
+            )
+        material = Material.objects.get(id=material.id)
+        self.assertEqual(material.raw_text, "legacy text")
+        self.assertEqual(material.summary_data, {"summary": "legacy"})
+
+
+class JSONArrayStreamParserTests(SimpleTestCase):
+    def feed_all(self, pieces):
+        parser = JSONArrayStreamParser()
+        return [obj for piece in pieces for obj in parser.feed(piece)]
+
+    def test_objects_split_across_pieces(self):
+        text = '[{"segment": "one"}, {"segment": "two", "key_terms": ["a"]}]'
+        self.assertEqual(
+            self.feed_all(text[i:i + 3] for i in range(0, len(text), 3)),
+            [{"segment": "one"}, {"segment": "two", "key_terms": ["a"]}],
+        )
+
+    def test_braces_and_quotes_inside_strings(self):
+        text = r'[{"segment": "a {b} c", "example": "she said \"}\" and left"}, {"segment": "}{"}]'
+        self.assertEqual(
+            self.feed_all(text),
+            [{"segment": "a {b} c", "example": 'she said "}" and left'}, {"segment": "}{"}],
+        )
+
+    def test_prose_before_the_array_is_ignored(self):
+        text = 'Here are the segments {as "requested"}:\n[{"segment": "one"}]'
+        self.assertEqual(self.feed_all(text), [{"segment": "one"}])
+
+    def test_stream_that_stops_early_keeps_complete_objects(self):
+        self.assertEqual(self.feed_all(['[{"segment": "one"}, {"segment": "tw']), [{"segment": "one"}])
+
+
+class StreamCacheTests(SimpleTestCase):
+    def stream(self, lines):
+        response = mock.Mock()
+        response.iter_lines.return_value = lines
+        with mock.patch.object(llm_client, "post_chat_completion", return_value=response), \
+                mock.patch.object(llm_client.llm_cache, "lookup", return_value=None), \
+                mock.patch.object(llm_client.llm_cache, "store") as store:
+            deltas = list(llm_client.stream_chat_completion({"model": "m", "messages": []}, "key"))
+        return deltas, store
+
+    def chunk(self, content):
+        return "data: " + json.dumps({"choices": [{"delta": {"content": content}}]})
+
+    def test_finished_stream_is_cached(self):
+        deltas, store = self.stream([self.chunk("[{}"), self.chunk("]"), "data: [DONE]"])
+        self.assertEqual(deltas, ["[{}", "]"])
+        self.assertEqual(store.call_args.args[1], "[{}]")
+
+    def test_stream_that_just_stops_is_not_cached(self):
+        deltas, store = self.stream([self.chunk('[{"segment": "one"}, {"seg')])
+        self.assertEqual(deltas, ['[{"segment": "one"}, {"seg'])
+        store.assert_not_called()
+
+
+class UploadHashTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="reader", email="reader@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_upload_is_hashed_while_it_arrives(self):
+        line = b"Rivers carry water from the mountains back to the sea.\n"
+        # One upload kept in memory, one spooled to a temporary file
+        for content in (line * 10, line * 10000):
+            upload = SimpleUploadedFile("notes.txt", content, content_type="text/plain")
+            with mock.patch.object(upload_cache.hashlib, "sha256", wraps=hashlib.sha256) as sha256:
+                response = self.client.post(reverse("upload-file"), {"file": upload}, format="multipart")
+            self.assertEqual(response.status_code, 200)
+            # Only the upload handler hashed the bytes; the view didn't read them again
+            self.assertEqual(sha256.call_count, 1)
+            self.assertTrue(UploadCacheEntry.objects.filter(sha256=hashlib.sha256(content).hexdigest()).exists())
@@ -0,0 +1,160 @@
+# upload_cache.py
+
+import hashlib
+import os
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import DatabaseError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .caching import CacheStats
+from .models import UploadCacheEntry
+
+UPLOAD_CACHE_ENABLED = os.getenv("UPLOAD_CACHE_ENABLED", "1") == "1"
+UPLOAD_CACHE_MAX_BYTES = int(os.getenv("UPLOAD_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_CACHE_PRUNE_EVERY = int(os.getenv("UPLOAD_CACHE_PRUNE_EVERY", "20"))
+
+# Bump whenever extract_document/clean_text output changes
+EXTRACTION_VERSION = 4
+
+stats = CacheStats("hits", "misses", "stores", "evictions", "bytes_saved")
+
+
+class HashingMixin:
+    """
+    Upload handler mixin that hashes each file while Django receives it and
+    stores the hex digest as file.sha256, so the cache key costs no second
+    pass over the upload.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # The memory handler passes files too big for it on; the next handler hashes those
+        self._sha256 = hashlib.sha256() if getattr(self, "activated", True) else None
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self._sha256 is not None:
+            self._sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None and self._sha256 is not None:
+            file.sha256 = self._sha256.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def hash_upload(file):
+    """
+    SHA-256 of an uploaded file: the digest taken while it was uploaded (see
+    FILE_UPLOAD_HANDLERS), else read chunk by chunk and rewound afterwards.
+    """
+    if getattr(file, "sha256", None):
+        return file.sha256
+    digest = hashlib.sha256()
+    if hasattr(file, "chunks"):
+        for chunk in file.chunks():
+            digest.update(chunk)
+    else:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def lookup(sha256, ext):
+    """Returns the cached cleaned text for these bytes, or None."""
+    if not UPLOAD_CACHE_ENABLED:
+        return None
+
+    try:
+        entry = (
+            UploadCacheEntry.objects.filter(sha256=sha256, ext=ext, version=EXTRACTION_VERSION)
+            .only("cleaned_text", "source_bytes")
+            .first()
+        )
+        if entry is None:
+            stats.incr("misses")
+            return None
+        UploadCacheEntry.objects.filter(sha256=sha256).update(hits=F("hits") + 1, last_used_at=timezone.now())
+    except DatabaseError:
+        stats.incr("misses")
+        return None
+
+    stats.incr("hits")
+    stats.incr("bytes_saved", entry.source_bytes)
+    return entry.cleaned_text
+
+
+def store(sha256, ext, cleaned_text, source_bytes):
+    if not UPLOAD_CACHE_ENABLED:
+        return
+
+    try:
+        UploadCacheEntry.objects.update_or_create(
+            sha256=sha256,
+            defaults={
+                "ext": ext,
+                "version": EXTRACTION_VERSION,
+                "cleaned_text": cleaned_text,
+                "size": len(cleaned_text.encode("utf-8")),
+                "source_bytes": source_bytes,
+                "last_used_at": timezone.now(),
+            },
+        )
+    except DatabaseError:
+        return
+
+    stats.incr("stores")
+    if stats.snapshot()["stores"] % UPLOAD_CACHE_PRUNE_EVERY == 0:
+        prune()
+
+
+def prune():
+    """Evicts least recently used entries until the store is under UPLOAD_CACHE_MAX_BYTES."""
+    UploadCacheEntry.objects.exclude(version=EXTRACTION_VERSION).delete()
+
+    total = UploadCacheEntry.objects.aggregate(total=Sum("size"))["total"] or 0
+    if total <= UPLOAD_CACHE_MAX_BYTES:
+        return 0
+
+    to_free = total - UPLOAD_CACHE_MAX_BYTES
+    victims = []
+    for sha256, size in UploadCacheEntry.objects.order_by("last_used_at").values_list("sha256", "size").iterator():
+        victims.append(sha256)
+        to_free -= size
+        if to_free <= 0:
+            break
+
+    removed, _ = UploadCacheEntry.objects.filter(sha256__in=victims).delete()
+    stats.incr("evictions", removed)
+    return removed
+
+
+def report():
+    """Hit rate and bytes saved, for this process and across all time."""
+    counters = stats.snapshot()
+    lookups = counters["hits"] + counters["misses"]
+    persistent = UploadCacheEntry.objects.aggregate(
+        stored_bytes=Sum("size"),
+        total_hits=Sum("hits"),
+        total_bytes_saved=Sum(F("hits") * F("source_bytes")),
+    )
+
+    return {
+        **counters,
+        "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        "db_items": UploadCacheEntry.objects.count(),
+        "db_bytes": persistent["stored_bytes"] or 0,
+        "total_hits": persistent["total_hits"] or 0,
+        "total_bytes_saved": persistent["total_bytes_saved"] or 0,
+    }
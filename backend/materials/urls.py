@@ -4,14 +4,27 @@ from . import views
 
 urlpatterns = [
     path("upload-file/", views.upload_file, name="upload-file"),
+    path("ingest/", views.ingest_view, name="ingest"),
     path("", materials_list, name="materials_list"),  # GET all materials
+    path("search/", views.search_materials, name="search_materials"),
     path("segment/", segment_view, name="segment_material"),
     path("summarize/", summarize_view, name="summarize_material"),
+    path("segment/stream/", views.segment_stream_view, name="segment_material_stream"),
+    path("summarize/stream/", views.summarize_stream_view, name="summarize_material_stream"),
     path("<int:material_id>/", material_detail, name="material_detail"),
+    path("<int:material_id>/segments/", views.material_segments, name="material_segments"),
+    path("<int:material_id>/segments/<int:position>/", views.segment_detail, name="segment_detail"),
     path("<int:material_id>/insights/", educational_insights, name="educational_insights"),
     path("<int:material_id>/generate-quiz/", generate_quiz, name="generate_quiz"),
+    path("<int:material_id>/glossary/", views.material_glossary, name="material_glossary"),
     path("vocab/", views.vocabulary_list_create, name="vocab_list_create"),
     path("vocab/<int:pk>/", views.vocabulary_delete, name="vocab_delete"),
-    path("vocabulary/lookup/", lookup_definition)
+    path("vocabulary/lookup/", lookup_definition),
+    path("jobs/<uuid:job_id>/", views.job_detail, name="job_detail"),
+    path("jobs/<uuid:job_id>/result/", views.job_result, name="job_result"),
+    path("jobs/<uuid:job_id>/cancel/", views.job_cancel, name="job_cancel"),
+    path("llm-cache/stats/", views.llm_cache_stats, name="llm_cache_stats"),
+    path("upload-cache/stats/", views.upload_cache_stats, name="upload_cache_stats"),
+    path("dictionary/stats/", views.dictionary_stats, name="dictionary_stats"),
 
 ]
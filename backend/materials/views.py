@@ -1,167 +1,424 @@
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Count, Exists, Max, OuterRef, Q
+from django.db.models.functions import Lower
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Material, Vocabulary
-from .serializers import MaterialSerializer, VocabularySerializer
-from .segmentation import segment_text
-from .summarization import summarize_text
+from .models import Material, Segment, Vocabulary, Job
+from .serializers import MaterialSerializer, MaterialListSerializer, SegmentSerializer, VocabularySerializer, JobSerializer
+from .segmentation import segment_text, stream_segment_text, ENGINES as SEGMENT_ENGINES
+from .summarization import summarize_text, stream_summarize_text, ENGINES as SUMMARY_ENGINES
+from .llm_client import GroqAPIError
+from .renderers import FastJSONRenderer
+from .streaming import EventStreamRenderer, sse_event
 from .quiz import generate_quiz_from_summary
 from .education import generate_educational_insights
-
-import re
-import pdfplumber
-import docx
-from pptx import Presentation
-from PIL import Image
-import pytesseract
+from . import compaction
+from . import dictionary
+from . import llm_cache
+from . import search
+from . import jobs
+from . import upload_cache
+from .conditional import conditional
+
+from .dictionary import DictionaryUnavailable
+from .extraction import clean_text, extract_document, file_extension, SUPPORTED_EXTENSIONS, UnsupportedFileType
 from .models import Vocabulary
-import requests
 
+# ?view=summary page size (default and maximum)
+MATERIALS_PAGE_SIZE = 20
+MATERIALS_PAGE_MAX = 100
+# segments/ window size (default and maximum)
+SEGMENTS_PAGE_SIZE = 20
+SEGMENTS_PAGE_MAX = 200
+# search/ page size (default and maximum)
+SEARCH_PAGE_SIZE = 20
+SEARCH_PAGE_MAX = 50
+# glossary/ resolves at most this many distinct key terms
+GLOSSARY_MAX_TERMS = 200
+
+
+def _resolve_text(request):
+    """
+    Returns (material, text) for an LLM endpoint. The client may send just
+    material_id, in which case the stored raw_text is used instead of
+    re-uploading it. material is None when no (valid) material_id was given.
+    """
+    text = request.data.get("text") or ""
+    material_id = request.data.get("material_id")  # Optional: existing material
 
-# Make sure Tesseract is correctly pointed
-pytesseract.pytesseract.tesseract_cmd = r"C:\Users\Jamie\AppData\Local\Programs\Tesseract-OCR\tesseract.exe"
+    material = None
+    if material_id:
+        material = (
+            Material.objects.filter(id=material_id, user=request.user)
+            .defer("segmented_data", "summary_data", "quiz_data")
+            .first()
+        )
+    if not text.strip() and material is not None:
+        text = material.raw_text
+    return material, text
+
+
+def _save_material(user, material, text, title, **fields):
+    """
+    Writes LLM results onto the user's material, creating it if needed.
+    Only the given fields are updated, so e.g. saving a summary keeps
+    segmented_data intact; raw_text is only rewritten if its hash changed.
+    A segmented_data list is stored as Segment rows.
+    """
+    has_segments = "segmented_data" in fields
+    segments = fields.pop("segmented_data", None)
+    material = _write_material(user, material, text, title, **fields)
+    if has_segments:
+        material.set_segments(segments)
+    return material
+
+
+def _write_material(user, material, text, title, **fields):
+    if material is not None:
+        for name, value in fields.items():
+            setattr(material, name, value)
+
+        fields_to_update = [*fields]
+        if material.text_changed(text):
+            material.raw_text = text
+            fields_to_update.append("raw_text")
+        if title:
+            material.title = title
+            fields_to_update.append("title")
 
+        # ✅ Only update these fields; keeps the other results intact
+        if fields_to_update:
+            material.save(update_fields=fields_to_update)
+        return material
 
-def clean_text(text: str) -> str:
-    # Remove emojis
-    text = re.sub(
-        r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]',
-        '',
-        text
+    return Material.objects.create(
+        user=user,
+        title=title or "Untitled",
+        raw_text=text,
+        **fields
     )
-    # Remove short lines (less than 5 words)
-    lines = [line for line in text.split('\n') if len(line.split()) > 4]
-    return '\n'.join(lines)
+
+
+def _is_truthy(value):
+    return value is True or str(value).lower() in ("1", "true", "yes")
+
+
+def _long_document(request):
+    """The client's long_document flag as a bool, or None to let summarization decide."""
+    value = request.data.get("long_document")
+    if value is None or value == "":
+        return None
+    return _is_truthy(value)
+
+
+def _wants_async(request):
+    """True when the client asked for a 202 + job instead of waiting (?async=1)."""
+    return _is_truthy(request.data.get("async", request.query_params.get("async")))
+
+
+def _job_accepted(job):
+    data = JobSerializer(job).data
+    data["job_id"] = data["id"]
+    response = Response(data, status=status.HTTP_202_ACCEPTED)
+    response["Location"] = reverse("job_detail", args=[job.id])
+    return response
 
 
 # --- SEGMENTATION ---
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def segment_view(request):
-    text = request.data.get("text", "")
+    material, text = _resolve_text(request)
     title = request.data.get("title", "")
-    material_id = request.data.get("material_id")  # Optional: existing material
+    engine = request.data.get("engine")  # "llm" or "local"
 
     if not text.strip():
         return Response({"error": "No text provided"}, status=status.HTTP_400_BAD_REQUEST)
+    if engine and engine not in SEGMENT_ENGINES:
+        return Response({"error": f"Unknown engine: {engine}"}, status=status.HTTP_400_BAD_REQUEST)
 
-    segmented = segment_text(text)
+    if _wants_async(request):
+        material = _save_material(request.user, material, text, title)
+        return _job_accepted(jobs.enqueue(request.user, "segment", material=material, params={"engine": engine}))
 
-    if material_id:
-        # ✅ Update existing material WITHOUT wiping summary_data
-        try:
-            material = Material.objects.get(id=material_id, user=request.user)
+    segmented = segment_text(text, engine=engine)
+    material = _save_material(request.user, material, text, title, segmented_data=segmented)
+    data = MaterialSerializer(material).data
 
-            material.segmented_data = segmented
-            # Optional: keep raw_text/title in sync with latest text
-            material.raw_text = text
-            if title:
-                material.title = title
+    # Local segments render right away; explanations/examples follow in the background
+    if engine == "local" and _is_truthy(request.data.get("enrich")):
+        data["enrichment_job_id"] = jobs.enqueue(request.user, "enrich", material=material).id
 
-            fields_to_update = ["segmented_data", "raw_text"]
-            if title:
-                fields_to_update.append("title")
+    return Response(data, status=status.HTTP_200_OK)
 
-            # ✅ Only update these fields; keeps summary_data intact
-            material.save(update_fields=fields_to_update)
 
-        except Material.DoesNotExist:
-            # If material_id is invalid, create a new one
-            material = Material.objects.create(
-                user=request.user,
-                title=title or "Untitled",
-                raw_text=text,
-                segmented_data=segmented
-            )
-    else:
-        # No material_id, create new
-        material = Material.objects.create(
-            user=request.user,
-            title=title or "Untitled",
-            raw_text=text,
-            segmented_data=segmented
+# --- SUMMARIZATION ---
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def summarize_view(request):
+    material, text = _resolve_text(request)
+    title = request.data.get("title", "")
+    engine = request.data.get("engine")  # "llm", "extractive" or "auto"
+
+    if not text.strip():
+        return Response({"error": "No text provided"}, status=status.HTTP_400_BAD_REQUEST)
+    if engine and engine not in SUMMARY_ENGINES:
+        return Response({"error": f"Unknown engine: {engine}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if _wants_async(request):
+        material = _save_material(request.user, material, text, title)
+        job = jobs.enqueue(
+            request.user, "summarize", material=material,
+            params={"long_document": _long_document(request), "engine": engine}
         )
+        return _job_accepted(job)
 
-    return Response(MaterialSerializer(material).data, status=status.HTTP_200_OK)
+    # Generate the summary (long texts are summarized map-reduce style)
+    summary_obj = summarize_text(text, long_document=_long_document(request), engine=engine)
+    summary_text = summary_obj.get("summary") if isinstance(summary_obj, dict) else str(summary_obj)
+
+    material = _save_material(request.user, material, text, title, summary_data={"summary": summary_text})
+
+    # Return the summary and material ID to frontend
+    return Response(
+        {
+            "summary": summary_text,
+            "id": material.id,
+            "engine": summary_obj.get("engine"),
+            "compaction": summary_obj.get("compaction"),
+        },
+        status=status.HTTP_200_OK
+    )
+
+
+# --- STREAMING (Server-Sent Events) ---
+def _event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
 
 
-# --- SUMMARIZATION ---
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
-def summarize_view(request):
-    text = request.data.get("text", "")
-    material_id = request.data.get("material_id")
+@renderer_classes([FastJSONRenderer, EventStreamRenderer])
+def segment_stream_view(request):
+    """
+    Same as segment_view, but sends each segment as an SSE "segment" event as
+    soon as it is complete, then a "done" event once the result is saved.
+    """
+    material, text = _resolve_text(request)
     title = request.data.get("title", "")
+    user = request.user
 
     if not text.strip():
         return Response({"error": "No text provided"}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Generate the summary
-    summary_obj = summarize_text(text)
-    summary_text = summary_obj.get("summary") if isinstance(summary_obj, dict) else str(summary_obj)
+    def events():
+        segments = []
+        try:
+            for segment in stream_segment_text(text):
+                segments.append(segment)
+                yield sse_event("segment", {"index": len(segments) - 1, "segment": segment})
+        except GroqAPIError as e:
+            yield sse_event("error", {"error": str(e)})
+            return
 
-    if material_id:
+        saved = _save_material(user, material, text, title, segmented_data=segments)
+        yield sse_event("done", {"id": saved.id, "count": len(segments)})
+
+    return _event_stream_response(events())
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@renderer_classes([FastJSONRenderer, EventStreamRenderer])
+def summarize_stream_view(request):
+    """
+    Same as summarize_view, but relays the summary as SSE "token" events while
+    Groq writes it, then a "done" event with the saved material ID.
+    """
+    material, text = _resolve_text(request)
+    title = request.data.get("title", "")
+    long_document = _long_document(request)
+    engine = request.data.get("engine")
+    user = request.user
+
+    if not text.strip():
+        return Response({"error": "No text provided"}, status=status.HTTP_400_BAD_REQUEST)
+    if engine and engine not in SUMMARY_ENGINES:
+        return Response({"error": f"Unknown engine: {engine}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    def events():
+        parts = []
         try:
-            # ✅ Update existing material WITHOUT wiping segmented_data
-            material = Material.objects.get(id=material_id, user=request.user)
+            for delta in stream_summarize_text(text, long_document=long_document, engine=engine):
+                parts.append(delta)
+                yield sse_event("token", {"text": delta})
+        except GroqAPIError as e:
+            yield sse_event("error", {"error": str(e)})
+            return
 
-            material.summary_data = {"summary": summary_text}
-            # Optional: keep raw_text/title in sync with latest text
-            material.raw_text = text
-            if title:
-                material.title = title
+        summary_text = "".join(parts).strip()
+        saved = _save_material(user, material, text, title, summary_data={"summary": summary_text})
+        yield sse_event("done", {"id": saved.id, "summary": summary_text})
 
-            fields_to_update = ["summary_data", "raw_text"]
-            if title:
-                fields_to_update.append("title")
+    return _event_stream_response(events())
 
-            # ✅ Only update these fields; keeps segmented_data intact
-            material.save(update_fields=fields_to_update)
 
-        except Material.DoesNotExist:
-            # Invalid ID: create new material
-            material = Material.objects.create(
-                user=request.user,
-                raw_text=text,
-                summary_data={"summary": summary_text},
-                title=title or "Untitled"
-            )
-    else:
-        # No material_id: create new material
-        material = Material.objects.create(
-            user=request.user,
-            raw_text=text,
-            summary_data={"summary": summary_text},
-            title=title or "Untitled"
-        )
+# --- CONDITIONAL GET ---
+def _collection_version(queryset, name, user):
+    """
+    (None, token) for a user's rows; the count catches deletions. No
+    Last-Modified: deleting a row doesn't move the newest updated_at, so an
+    If-Modified-Since check would answer 304 with the deleted row still cached.
+    """
+    version = queryset.aggregate(latest=Max("updated_at"), count=Count("id"))
+    latest = version["latest"]
+    return None, f"{name}:{user.id}:{version['count']}:{latest.isoformat() if latest else ''}"
 
-    # Return the summary and material ID to frontend
-    return Response(
-        {"summary": summary_text, "id": material.id},
-        status=status.HTTP_200_OK
+
+def _materials_version(request):
+    return _collection_version(Material.objects.filter(user=request.user), "materials", request.user)
+
+
+def _material_version(request, material_id):
+    updated_at = (
+        Material.objects.filter(id=material_id, user=request.user).values_list("updated_at", flat=True).first()
     )
+    if updated_at is None:
+        return None
+    return updated_at, f"material:{material_id}:{updated_at.isoformat()}"
+
+
+def _vocabulary_version(request):
+    return _collection_version(Vocabulary.objects.filter(user=request.user), "vocabulary", request.user)
+
+
+# --- SPARSE FIELDSETS ---
+def _sparse_fields(request, serializer_class, queryset):
+    """
+    Applies ?fields= / ?exclude= (comma-separated serializer field names) to a
+    read. Returns (queryset, names): the queryset loads only the columns those
+    fields need, and names goes to the serializer as fields=. names is None
+    when neither parameter is given. Raises ValueError for unknown fields.
+    """
+    fields = request.query_params.get("fields")
+    exclude = request.query_params.get("exclude")
+    if fields is None and exclude is None:
+        return queryset, None
+
+    names = serializer_class.select(fields, exclude)
+    return queryset.only("id", *serializer_class.columns(names)), names
 
 
 # --- GET ALL MATERIALS ---
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@conditional(_materials_version)
 def materials_list(request):
-    materials = Material.objects.filter(user=request.user).order_by("-created_at")
-    serializer = MaterialSerializer(materials, many=True)
+    """
+    Full materials by default, trimmed with ?fields= / ?exclude= (e.g.
+    ?fields=id,title,summary_data reads no text or segments). ?view=summary
+    returns a lightweight, keyset-paginated listing instead:
+    {"results": [...], "next_cursor": ...}, with ?limit= (max
+    MATERIALS_PAGE_MAX) and ?cursor= from the previous page.
+    """
+    if request.query_params.get("view") == "summary":
+        return _materials_summary_page(request)
+
+    try:
+        materials, fields = _sparse_fields(request, MaterialSerializer, Material.objects.filter(user=request.user))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if fields is None or "segmented_data" in fields:
+        materials = materials.prefetch_related("segments")
+    serializer = MaterialSerializer(materials.order_by("-created_at"), many=True, fields=fields)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+def _encode_cursor(material):
+    raw = json.dumps([material.created_at.isoformat(), material.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    """Returns (created_at, id); raises ValueError for anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, material_id = json.loads(raw)
+        created_at = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(material_id, int):
+        raise ValueError("Invalid cursor")
+    return created_at, material_id
+
+
+def _materials_summary_page(request):
+    try:
+        limit = min(int(request.query_params.get("limit", MATERIALS_PAGE_SIZE)), MATERIALS_PAGE_MAX)
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    if limit < 1:
+        return Response({"error": "limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+    materials = (
+        Material.objects.filter(user=request.user)
+        .only("id", "title", "created_at", "word_count")
+        .annotate(
+            has_segments=Q(segmented_data__isnull=False) | Exists(Segment.objects.filter(material=OuterRef("pk"))),
+            has_summary=Q(summary_data__isnull=False),
+            has_quiz=Q(quiz_data__isnull=False),
+        )
+        .order_by("-created_at", "-id")
+    )
+
+    cursor = request.query_params.get("cursor")
+    if cursor:
+        try:
+            created_at, material_id = _decode_cursor(cursor)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        materials = materials.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=material_id)
+        )
+
+    # One extra row tells us whether there is a next page
+    page = list(materials[:limit + 1])
+    next_cursor = _encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return Response(
+        {"results": MaterialListSerializer(page[:limit], many=True).data, "next_cursor": next_cursor},
+        status=status.HTTP_200_OK,
+    )
+
+
 @api_view(["GET", "DELETE", "PATCH"])
 @permission_classes([IsAuthenticated])
+@conditional(_material_version)
 def material_detail(request, material_id):
+    """GET accepts ?fields= / ?exclude= to load and return only some fields."""
+    materials, fields = Material.objects.all(), None
+    if request.method == "GET":
+        try:
+            materials, fields = _sparse_fields(request, MaterialSerializer, materials)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
     try:
-        material = Material.objects.get(id=material_id, user=request.user)
+        material = materials.get(id=material_id, user=request.user)
     except Material.DoesNotExist:
         return Response({"error": "Material not found"}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == "GET":
-        serializer = MaterialSerializer(material)
+        serializer = MaterialSerializer(material, fields=fields)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     if request.method == "PATCH":
@@ -175,6 +432,90 @@ def material_detail(request, material_id):
     material.delete()
     return Response({"message": "Material deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
+# --- SEARCH ---
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def search_materials(request):
+    """
+    Ranked full-text search over the user's materials (title, text, summary,
+    segment key terms): ?q=, ?page= (1-based), ?limit= (max SEARCH_PAGE_MAX).
+    Each result carries a highlighted snippet.
+    """
+    query = (request.query_params.get("q") or "").strip()
+    if not query:
+        return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = int(request.query_params.get("page", 1))
+        limit = min(int(request.query_params.get("limit", SEARCH_PAGE_SIZE)), SEARCH_PAGE_MAX)
+    except ValueError:
+        return Response({"error": "page and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+    if page < 1 or limit < 1:
+        return Response({"error": "page and limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+    offset = (page - 1) * limit
+    if search.is_available():
+        total, results = search.search(request.user, query, offset=offset, limit=limit)
+    else:
+        # No FTS index on this database: title matches only
+        matches = Material.objects.filter(user=request.user, title__icontains=query).order_by("-created_at")
+        total = matches.count()
+        results = [
+            {"id": m.id, "title": m.title, "snippet": "", "rank": 0.0}
+            for m in matches.only("id", "title")[offset:offset + limit]
+        ]
+
+    return Response(
+        {"count": total, "page": page, "has_next": offset + len(results) < total, "results": results},
+        status=status.HTTP_200_OK,
+    )
+
+
+# --- SEGMENTS ---
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def material_segments(request, material_id):
+    """
+    A window of a material's segments: ?start= (position, default 0) and
+    ?limit= (default SEGMENTS_PAGE_SIZE, max SEGMENTS_PAGE_MAX), so the reader
+    can load only the segments it shows.
+    """
+    if not Material.objects.filter(id=material_id, user=request.user).exists():
+        return Response({"error": "Material not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        start = int(request.query_params.get("start", 0))
+        limit = min(int(request.query_params.get("limit", SEGMENTS_PAGE_SIZE)), SEGMENTS_PAGE_MAX)
+    except ValueError:
+        return Response({"error": "start and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+    if start < 0 or limit < 1:
+        return Response({"error": "start must be >= 0 and limit positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+    segments = Segment.objects.filter(material_id=material_id)
+    page = segments.filter(position__gte=start).order_by("position")[:limit]
+    return Response(
+        {"count": segments.count(), "start": start, "results": SegmentSerializer(page, many=True).data},
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(["GET", "PATCH"])
+@permission_classes([IsAuthenticated])
+def segment_detail(request, material_id, position):
+    try:
+        segment = Segment.objects.get(material_id=material_id, material__user=request.user, position=position)
+    except Segment.DoesNotExist:
+        return Response({"error": "Segment not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == "GET":
+        return Response(SegmentSerializer(segment).data, status=status.HTTP_200_OK)
+
+    serializer = SegmentSerializer(segment, data=request.data, partial=True)
+    if serializer.is_valid():
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 # --- EDUCATIONAL INSIGHTS ---
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
@@ -184,52 +525,99 @@ def educational_insights(request, material_id):
     except Material.DoesNotExist:
         return Response({"error": "Material not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    if not material.segmented_data:
+    if not material.segment_payload:
         return Response({"error": "Material has no segmentation yet"}, status=status.HTTP_400_BAD_REQUEST)
 
-    insights = generate_educational_insights(material.segmented_data)
+    insights = generate_educational_insights(material.segment_payload)
     return Response(insights, status=status.HTTP_200_OK)
 
 
+def _extract_upload(file):
+    """
+    Returns (cleaned_text, extracted). Repeat uploads of the same bytes are
+    answered from the upload cache, in which case extracted is None.
+    Raises UnsupportedFileType.
+    """
+    ext = file_extension(file.name)
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise UnsupportedFileType(ext)
+
+    sha256 = upload_cache.hash_upload(file)
+    cached = upload_cache.lookup(sha256, ext)
+    if cached is not None:
+        return cached, None
+
+    extracted = extract_document(file, ext)
+    # Page breaks only help to find running headers/footers; none reach the client or raw_text
+    cleaned = compaction.join_pages(clean_text(extracted["lines"], pages=extracted["pages"] is not None))
+    upload_cache.store(sha256, ext, cleaned, file.size)
+    return cleaned, extracted
+
+
 # --- FILE UPLOAD (Does NOT create Material) ---
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def upload_file(request):
     if request.FILES.get('file'):
         file = request.FILES['file']
-        ext = file.name.split('.')[-1].lower()
-        text = ""
-
-        if ext == "pdf":
-            with pdfplumber.open(file) as pdf:
-                text = "\n".join(page.extract_text() for page in pdf.pages if page.extract_text())
-        elif ext == "docx":
-            doc = docx.Document(file)
-            text = "\n".join(p.text for p in doc.paragraphs)
-        elif ext == "txt":
-            text = file.read().decode('utf-8')
-        elif ext == "pptx":
-            prs = Presentation(file)
-            text = "\n".join(
-                shape.text
-                for slide in prs.slides
-                for shape in slide.shapes
-                if hasattr(shape, "text")
-            )
-        elif ext in ["jpg", "png"]:
-            img = Image.open(file).convert("RGB")
-            text = pytesseract.image_to_string(img)
-        else:
-            return Response({"error": "Unsupported file type"}, status=status.HTTP_400_BAD_REQUEST)
 
-        cleaned = clean_text(text)
+        try:
+            cleaned, extracted = _extract_upload(file)
+        except UnsupportedFileType:
+            return Response({"error": "Unsupported file type"}, status=status.HTTP_400_BAD_REQUEST)
 
         # DO NOT create Material here, just return cleaned text
-        return Response({"cleaned_text": cleaned}, status=status.HTTP_200_OK)
+        data = {"cleaned_text": cleaned, "cached": extracted is None}
+        if extracted and extracted["timings"] and _is_truthy(request.query_params.get("timings")):
+            data["timings"] = extracted["timings"]
+        return Response(data, status=status.HTTP_200_OK)
 
     return Response({"error": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST)
 
 
+# --- INGEST PIPELINE ---
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def ingest_view(request):
+    """
+    One-shot upload: extracts and cleans the file, creates the Material once,
+    then runs segment ∥ summarize → quiz as a background job (202 + job id).
+    Poll jobs/<id>/ for per-stage progress.
+    """
+    file = request.FILES.get("file")
+    if not file:
+        return Response({"error": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST)
+
+    segment_engine = request.data.get("segment_engine")
+    summary_engine = request.data.get("summary_engine")
+    if segment_engine and segment_engine not in SEGMENT_ENGINES:
+        return Response({"error": f"Unknown engine: {segment_engine}"}, status=status.HTTP_400_BAD_REQUEST)
+    if summary_engine and summary_engine not in SUMMARY_ENGINES:
+        return Response({"error": f"Unknown engine: {summary_engine}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        cleaned, _ = _extract_upload(file)
+    except UnsupportedFileType:
+        return Response({"error": "Unsupported file type"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not cleaned.strip():
+        return Response({"error": "No text could be extracted"}, status=status.HTTP_400_BAD_REQUEST)
+
+    title = request.data.get("title") or file.name.rsplit(".", 1)[0]
+    material = Material.objects.create(user=request.user, title=title, raw_text=cleaned)
+
+    job = jobs.enqueue(
+        request.user, "pipeline", material=material,
+        params={
+            "segment_engine": segment_engine,
+            "summary_engine": summary_engine,
+            "long_document": _long_document(request),
+        },
+        progress={"extract": "done", "segment": "pending", "summarize": "pending", "quiz": "pending"},
+    )
+    return _job_accepted(job)
+
+
 # --- QUIZ GENERATION ---
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
@@ -244,6 +632,9 @@ def generate_quiz(request, material_id):
     if not summary_text.strip():
         return Response({"error": "No summary available to generate a quiz."}, status=status.HTTP_400_BAD_REQUEST)
 
+    if _wants_async(request):
+        return _job_accepted(jobs.enqueue(request.user, "quiz", material=material, params={"num_questions": 5}))
+
     quiz_result = generate_quiz_from_summary(summary_text, num_questions=5)
 
     if not quiz_result:
@@ -258,10 +649,14 @@ def generate_quiz(request, material_id):
 
 @api_view(["GET", "POST"])
 @permission_classes([IsAuthenticated])
+@conditional(_vocabulary_version)
 def vocabulary_list_create(request):
     if request.method == "GET":
-        vocab = Vocabulary.objects.filter(user=request.user)
-        serializer = VocabularySerializer(vocab, many=True)
+        try:
+            vocab, fields = _sparse_fields(request, VocabularySerializer, Vocabulary.objects.filter(user=request.user))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = VocabularySerializer(vocab, many=True, fields=fields)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     # POST
@@ -308,40 +703,168 @@ def lookup_definition(request):
             "example": existing.example
         })
 
-    # 2) Fetch from Free Dictionary API
+    # 2) Shared definition cache (memory, then DB), else the Free Dictionary API
+    try:
+        definition = dictionary.lookup(word)
+    except DictionaryUnavailable:
+        return Response({"error": "Dictionary service unavailable"}, status=503)
+    if definition is None:
+        return Response({"error": "No definition found"}, status=404)
+
+    # 3) Save into your Vocabulary
+    vocab, _ = Vocabulary.objects.get_or_create(
+        user=request.user,
+        word=word,
+        defaults={"meaning": definition["meaning"], "example": definition["example"]},
+    )
+
+    return Response({
+        "word": vocab.word,
+        "meaning": vocab.meaning,
+        "example": vocab.example
+    })
+
+
+def _glossary_terms(material):
+    """Distinct key terms across a material's segments, in reading order: {normalized: as written}."""
+    max_length = Vocabulary._meta.get_field("word").max_length
+    terms = {}
+    for segment in material.segment_payload or []:
+        if not isinstance(segment, dict):
+            continue
+        for term in segment.get("key_terms") or []:
+            word = " ".join(str(term).split())
+            key = dictionary.normalize(word)
+            if key and len(word) <= max_length and key not in terms:
+                terms[key] = word
+                if len(terms) == GLOSSARY_MAX_TERMS:
+                    return terms
+    return terms
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def material_glossary(request, material_id):
+    """
+    Definitions for every key term of a material in one request, saved to the
+    user's vocabulary (hence POST). Words already saved or cached are answered directly;
+    the rest are looked up concurrently (see dictionary.lookup_many).
+    """
     try:
-        url = f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}"
-        r = requests.get(url, timeout=10)
-        if r.status_code != 200:
-            return Response({"error": "No definition found"}, status=404)
+        material = Material.objects.only("id", "user_id", "segmented_data").get(id=material_id, user=request.user)
+    except Material.DoesNotExist:
+        return Response({"error": "Material not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        data = r.json()
+    terms = _glossary_terms(material)
+    saved = {
+        vocab.key: vocab
+        for vocab in Vocabulary.objects.filter(user=request.user)
+        .annotate(key=Lower("word"))
+        .filter(key__in=list(terms))
+    }
+
+    definitions, unavailable = dictionary.lookup_many([word for key, word in terms.items() if key not in saved])
+
+    new_vocab = [
+        Vocabulary(user=request.user, word=terms[key], meaning=definition["meaning"], example=definition["example"])
+        for key, definition in definitions.items()
+        if definition is not None
+    ]
+    # One insert; words saved meanwhile by another request are skipped by unique_together
+    Vocabulary.objects.bulk_create(new_vocab, ignore_conflicts=True)
+
+    results, missing = [], []
+    for key, word in terms.items():
+        if key in saved:
+            vocab = saved[key]
+            results.append({"word": vocab.word, "meaning": vocab.meaning, "example": vocab.example or ""})
+        elif definitions.get(key) is not None:
+            definition = definitions[key]
+            results.append({"word": word, "meaning": definition["meaning"], "example": definition["example"]})
+        elif key in definitions:
+            missing.append(word)
 
-        # Pick the first definition
-        meaning = ""
-        example = ""
-        try:
-            meaning = data[0]["meanings"][0]["definitions"][0].get("definition", "")
-            example = data[0]["meanings"][0]["definitions"][0].get("example", "")
-        except Exception:
-            pass
-
-        if not meaning:
-            return Response({"error": "No definition found"}, status=404)
-
-        # 3) Save into your Vocabulary
-        vocab = Vocabulary.objects.create(
-            user=request.user,
-            word=word,
-            meaning=meaning,
-            example=example or ""
-        )
+    return Response(
+        {
+            "results": results,
+            "missing": missing,
+            "unavailable": [terms[key] for key in unavailable],
+        },
+        status=status.HTTP_200_OK,
+    )
 
-        return Response({
-            "word": vocab.word,
-            "meaning": vocab.meaning,
-            "example": vocab.example
-        })
 
-    except requests.RequestException:
-        return Response({"error": "Dictionary service unavailable"}, status=503)
+# --- BACKGROUND JOBS ---
+def _get_job(request, job_id, recover=True):
+    try:
+        job = Job.objects.get(id=job_id, user=request.user)
+    except Job.DoesNotExist:
+        return None
+    if recover and not job.is_finished:
+        # A poll is a chance to notice that the worker running this job died
+        jobs.recover_stale([job.id])
+        job.refresh_from_db()
+    return job
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def job_detail(request, job_id):
+    job = _get_job(request, job_id)
+    if job is None:
+        return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(JobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def job_result(request, job_id):
+    job = _get_job(request, job_id)
+    if job is None:
+        return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    if job.status == Job.SUCCEEDED:
+        return Response(job.result, status=status.HTTP_200_OK)
+    if job.status == Job.FAILED:
+        return Response({"error": job.error or "Job failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    if job.status == Job.CANCELLED:
+        return Response({"error": "Job was cancelled"}, status=status.HTTP_409_CONFLICT)
+
+    # Still queued or running
+    return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def job_cancel(request, job_id):
+    job = _get_job(request, job_id, recover=False)
+    if job is None:
+        return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    if job.is_finished or not jobs.cancel(job):
+        return Response({"error": "Job already finished"}, status=status.HTTP_409_CONFLICT)
+
+    job.refresh_from_db()
+    return Response(JobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+# --- CACHE STATS ---
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def llm_cache_stats(request):
+    """Hit/miss counters for the LLM response cache, and tokens saved by compaction (this process)."""
+    return Response({**llm_cache.report(), "compaction": compaction.stats.snapshot()}, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def upload_cache_stats(request):
+    """Hit rate and bytes saved by the upload deduplication cache."""
+    return Response(upload_cache.report(), status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def dictionary_stats(request):
+    """Hit/miss and request-coalescing counters for the shared dictionary cache."""
+    return Response(dictionary.report(), status=status.HTTP_200_OK)
@@ -0,0 +1,31 @@
+# workers.py
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Worker processes for CPU-heavy extraction work (defaults to the core count)
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", os.getenv("PDF_WORKERS", str(os.cpu_count() or 2))))
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    """
+    Per-process pool shared by PDF extraction and OCR.
+    Workers are spawned, never forked from a process holding DB connections and threads.
+    """
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    with _pool_lock:
+        # A worker that died (OOM, segfault in a native lib) breaks the whole pool
+        if _pool is None or _pool_pid != pid or getattr(_pool, "_broken", False):
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_pid = pid
+    return _pool
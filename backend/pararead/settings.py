@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
 
     'corsheaders.middleware.CorsMiddleware', 
+    # Compresses finished responses, so it sits above everything that builds them
+    'materials.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +66,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson-backed when installed, DRF's json module otherwise
+    'DEFAULT_RENDERER_CLASSES': (
+        'materials.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'materials.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 
@@ -106,6 +119,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Transactions take the write lock up front, so a read-then-write (the
+        # search index sync in signals.py) waits for other writers instead of
+        # failing with "database is locked"
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
@@ -148,6 +165,27 @@ STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
 
+# Generated data files
+# Built at deploy time rather than shipped (see .gitignore); the directory
+# must be writable by whoever runs the build commands.
+
+DATA_DIR = Path(os.getenv("DATA_DIR", BASE_DIR / "data"))
+# Written by `manage.py build_dictionary_index`
+DICTIONARY_INDEX_PATH = Path(os.getenv("DICTIONARY_INDEX_PATH", DATA_DIR / "dictionary.idx"))
+
+
+# File uploads
+# Anything larger than this is spooled to a temporary file instead of
+# being held in memory; extraction then streams from disk.
+
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+# Django's default handlers, plus hashing each file as it arrives (upload cache key)
+FILE_UPLOAD_HANDLERS = [
+    "materials.upload_cache.HashingMemoryFileUploadHandler",
+    "materials.upload_cache.HashingTemporaryFileUploadHandler",
+]
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 